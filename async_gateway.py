@@ -0,0 +1,284 @@
+import asyncio
+import functools
+import time
+
+import serial
+
+import metrics
+from browser import GameComGateway
+
+
+class AsyncGameComGateway(GameComGateway):
+    """Gateway on an asyncio event loop
+
+    Serial input is read as soon as the port becomes readable and output
+    frames are written by a single writer task, so typing keeps echoing
+    while a fetch runs. Fetches run as tasks; pressing M cancels one.
+
+    HTTP still goes through requests (run in the default executor), since
+    that is what the rest of the gateway uses. A cancelled fetch is dropped
+    right away; its worker thread finishes or times out in the background.
+    A port that goes away is reopened by a task, without blocking the loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None
+        self.frames = None
+        self.writer_task = None
+        self.fetch_task = None
+        self.fetch_label = ''
+        self.reopen_task = None
+
+    # -- output -------------------------------------------------------------
+
+    def flush(self, report=True):
+        """Hand the pending frame to the writer task instead of blocking"""
+        if self.frames is None:
+            return super().flush(report)
+        data = self.out.take()
+        if data:
+            self.frames.put_nowait((data, report))
+
+    async def writer(self):
+        """Write queued frames in order, paced to the link rate"""
+        while True:
+            data, report = await self.frames.get()
+            start = time.monotonic()
+            stalled = 0.0
+            try:
+                for chunk in self.out.chunks(data):
+                    if self.out.blocked():
+                        # XOFF/CTS: wait for the device (XON arrives via on_readable)
+                        held_off = time.monotonic()
+                        while (self.out.blocked() and time.monotonic() - held_off <
+                               self.out.stall_timeout):
+                            await asyncio.sleep(0.005)
+                        self.out.paused = False
+                        stalled += time.monotonic() - held_off
+                    sent_at = time.monotonic()
+                    self.ser.write(chunk)
+                    remaining = self.out.airtime(len(chunk)) - (time.monotonic() - sent_at)
+                    if remaining > 0:
+                        await asyncio.sleep(remaining)
+            except (serial.SerialException, OSError) as e:
+                # The frame is lost; the screen is redrawn once the port is back
+                self.port_lost(e)
+                continue
+            self.out.record(len(data), time.monotonic() - start, stalled)
+            metrics.observe('serial.send', self.out.last_seconds)
+            metrics.count('serial.bytes', len(data))
+            if report:
+                print(f"{self.log_prefix}>> {len(data)} bytes in "
+                      f"{self.out.last_seconds:.2f}s "
+                      f"({self.out.bytes_per_second:.0f} B/s avg)")
+
+    # -- input --------------------------------------------------------------
+
+    def on_readable(self):
+        """Event loop callback: the serial port has data"""
+        try:
+            waiting = self.ser.in_waiting
+            data = self.ser.read(waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self.port_lost(e)
+            return
+        if data:
+            self.handle_data(data)
+
+    def handle_key(self, char):
+        """Let M cancel an in-flight fetch without waiting for Enter"""
+        if self.fetching() and char in 'mM':
+            self.cancel_fetch()
+            self.user_buffer = ""
+            self.send('\r\n')
+            self.show_main_menu()
+            self.flush()
+            return
+        super().handle_key(char)
+
+    def handle_user_input(self, line):
+        """Only M is accepted while a fetch is running"""
+        if self.fetching():
+            self.send_line(f'\r\n{self.fetch_label} - M to cancel')
+            return
+        super().handle_user_input(line)
+
+    # -- fetches ------------------------------------------------------------
+
+    def fetching(self):
+        return self.fetch_task is not None and not self.fetch_task.done()
+
+    def cancel_fetch(self):
+        """Abandon the running fetch, if any"""
+        if self.fetching():
+            self.fetch_task.cancel()
+            if self.parse_pool:
+                self.parse_pool.cancel(self.session)
+            print(f"{self.log_prefix}Fetch cancelled")
+        self.fetch_task = None
+
+    def start_fetch(self, label, load, show, show_error, *args):
+        """Run load(*args) in the executor and show() the result on the loop"""
+        self.fetch_label = label
+        self.fetch_task = self.loop.create_task(
+            self.fetch(load, show, show_error, *args))
+
+    async def fetch(self, load, show, show_error, *args):
+        try:
+            result = await self.loop.run_in_executor(
+                None, metrics.profiler.call, load, *args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.count('fetch.errors')
+            show_error(e)
+        else:
+            if isinstance(result, tuple):
+                show(*result)
+            else:
+                show(result)
+        self.flush()
+
+    def fetch_url(self, url):
+        """Fetch and display arbitrary URL without blocking the loop"""
+        url = self.begin_fetch_url(url)
+        if url:
+            if self.progressive:
+                self.fetch_progressively(url)
+                return
+            self.start_fetch('Fetching', self.load_page,
+                             self.show_page, self.show_fetch_error, url)
+
+    def fetch_progressively(self, url):
+        """Show url's first screen once it arrives, without blocking the loop"""
+        loading = self.start_loading(url)
+        self.start_fetch('Fetching', loading.wait_ready,
+                         self.show_loading, self.show_fetch_error)
+
+    def reload_place(self, page, screen, viewing_links):
+        """Load a page left part way off the loop, then go back to it"""
+        self.start_fetch('Loading', self.load_page,
+                         functools.partial(self.reloaded, screen, viewing_links),
+                         functools.partial(self.reload_failed, page, screen,
+                                           viewing_links),
+                         page['url'])
+
+    def wait_for_rest(self, loading, line):
+        """Wait for the rest of the page off the loop, then run line"""
+        self.send_line('\r\nLoading rest of page...')
+        self.start_fetch('Loading', loading.wait_done,
+                         functools.partial(self.resume_loading, line),
+                         self.show_fetch_error)
+        return False
+
+    def resume_loading(self, line, loading):
+        if self.loading is not loading:
+            # Cancelled with M while waiting
+            return
+        self.finish_loading(loading)
+        # This fetch is over; let line run (it may start another)
+        self.fetch_task = None
+        self.handle_user_input(line)
+
+    def fetch_feed(self, name, show):
+        """Show a feed's snapshot, or load it without blocking the loop"""
+        snapshot = self.feeds.latest(name)
+        if snapshot is not None:
+            show(*snapshot.listing)
+            return
+        label = f'Fetching {self.feeds.feeds[name].label}'
+        self.send_line(f'\r\n{label}...')
+        self.flush()
+        self.start_fetch(label, self.load_feed, show, self.show_feed_error, name)
+
+    def handle_at_command(self, cmd):
+        """Answer AT commands without the blocking post-CONNECT sleep"""
+        if cmd.lower().strip().startswith('atdt'):
+            self.answer_dial()
+            self.loop.call_later(self.out.settle_time(), self.show_connected_menu)
+        else:
+            super().handle_at_command(cmd)
+
+    def show_connected_menu(self):
+        self.show_main_menu()
+        self.flush()
+
+    # -- serial port --------------------------------------------------------
+
+    async def open_when_ready(self):
+        """Open the port, retrying until the adapter shows up"""
+        waiting = False
+        while True:
+            try:
+                self.open_port()
+                return
+            except (serial.SerialException, OSError) as e:
+                if not waiting:
+                    print(f"{self.log_prefix}Waiting for serial port ({e})")
+                    waiting = True
+                await asyncio.sleep(self.reconnect_interval)
+
+    def port_lost(self, error):
+        """Stop watching a port that went away and start reopening it"""
+        if self.reopen_task is not None:
+            return
+        print(f"{self.log_prefix}Serial port lost: {error}")
+        metrics.count('serial.disconnects')
+        self.loop.remove_reader(self.ser.fileno())
+        self.close_port()
+        self.reopen_task = self.loop.create_task(self.reopen())
+
+    async def reopen(self):
+        """Reopen the port, then put the session's screen back up"""
+        await self.open_when_ready()
+        self.reopen_task = None
+        self.watch()
+        if self.connected:
+            self.resume()
+            self.flush()
+
+    # -- main loop ----------------------------------------------------------
+
+    def attach(self, loop):
+        """Start serving this port on loop"""
+        self.loop = loop
+        self.frames = asyncio.Queue()
+        self.writer_task = loop.create_task(self.writer())
+        self.watch()
+
+    def watch(self):
+        # Non-blocking reads; the loop tells us when there's data
+        self.ser.timeout = 0
+        self.loop.add_reader(self.ser.fileno(), self.on_readable)
+
+    def detach(self):
+        """Stop serving this port"""
+        if self.reopen_task is not None:
+            self.reopen_task.cancel()
+        else:
+            self.loop.remove_reader(self.ser.fileno())
+        self.cancel_fetch()
+        self.writer_task.cancel()
+
+    async def serve(self):
+        """Run until cancelled"""
+        if self.ser is None:
+            await self.open_when_ready()
+        self.attach(asyncio.get_running_loop())
+        self.report_ready()
+        self.feeds.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.detach()
+
+    def run(self):
+        """Main loop"""
+        print("Game.com Web Gateway running (asyncio)...")
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+            self.close_port()
+            self.print_stats()
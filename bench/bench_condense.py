@@ -0,0 +1,62 @@
+"""Bytes and airtime condensing saves on a run of articles from one site
+
+    python bench/bench_condense.py
+    python bench/bench_condense.py --pages 20 --page-kb 4
+
+Distills --pages synthetic news articles from the same host, in order, as
+if read one after another, and condenses each with one Condenser (so it
+learns the site's furniture as it goes). Per page: text bytes before and
+after, paragraphs dropped, screens of --rows lines, and seconds of airtime
+saved at --baud. Then the time condensing took.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import corpus
+from condense import Condenser
+from extract import distill
+from layout import ScreenLayout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--page-kb', type=float, default=0,
+                        help="byte budget per article's text (default: none)")
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--rows', type=int, default=12)
+    args = parser.parse_args()
+
+    rng = random.Random(1997)
+    pages = [distill(corpus.news_article(rng), f'https://news.example.com/story/{i}')
+             for i in range(args.pages)]
+    condenser = Condenser(max_bytes=int(args.page_kb * 1024) or None)
+    layout = ScreenLayout(rows=args.rows)
+    bytes_per_second = args.baud / 10.0
+
+    print(f"{'page':<6}{'bytes':>8}{'sent':>8}{'saved':>7}{'dropped':>9}"
+          f"{'screens':>10}{'airtime saved':>15}")
+    elapsed = 0.0
+    for i, page in enumerate(pages):
+        start = time.perf_counter()
+        condensed, report = condenser.condense(page)
+        elapsed += time.perf_counter() - start
+        before = sum(map(len, layout.content_frames(page['content'], True)))
+        after = sum(map(len, layout.content_frames(condensed['content'], True)))
+        screens = (f"{len(layout.content_frames(page['content'], True))}->"
+                   f"{len(layout.content_frames(condensed['content'], True))}")
+        percent = 100.0 * report.saved / report.before if report.before else 0.0
+        print(f"{i:<6}{report.before:>8}{report.after:>8}{percent:>6.0f}%"
+              f"{report.boilerplate + report.repeats:>9}{screens:>10}"
+              f"{(before - after) / bytes_per_second:>14.1f}s")
+    print(condenser.summary())
+    print(f"condensing took {elapsed / len(pages) * 1000:.2f} ms per page")
+
+
+if __name__ == '__main__':
+    main()
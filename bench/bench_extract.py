@@ -0,0 +1,75 @@
+"""Compare the single-pass extractor with the BeautifulSoup pipeline
+
+    python bench/bench_extract.py                 # synthetic corpus
+    python bench/bench_extract.py --corpus DIR    # your saved *.html pages
+
+For every page, prints the best-of-N time of the original multi-pass
+BeautifulSoup code and of each installed parser backend, and whether the
+backend's output (title, paragraphs, links) matches the original.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import corpus
+from extract import available_backends, distill, distill_soup
+
+URL = 'https://example.com/page'
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def load_corpus(path):
+    pages = []
+    for name in sorted(glob.glob(os.path.join(path, '*.htm*'))):
+        with open(name, 'rb') as f:
+            pages.append((os.path.basename(name), f.read().decode('utf-8', 'replace')))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--corpus', help='directory of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else corpus.build()
+    backends = available_backends()
+
+    header = f"{'page':<16}{'KB':>7}{'bs4 ms':>9}"
+    for name in backends:
+        header += f"{name + ' ms':>16}{'x':>6}{'same':>6}"
+    print(header)
+
+    totals = dict.fromkeys(['bs4'] + backends, 0.0)
+    for name, html in pages:
+        base, expected = best_of(lambda: distill_soup(html, URL), args.repeat)
+        totals['bs4'] += base
+        row = f"{name[:15]:<16}{len(html) / 1024:>7.0f}{base * 1000:>9.1f}"
+        for backend in backends:
+            t, page = best_of(lambda: distill(html, URL, backend), args.repeat)
+            totals[backend] += t
+            same = 'yes' if page == expected else 'no'
+            row += f"{t * 1000:>16.1f}{base / t:>6.1f}{same:>6}"
+        print(row)
+
+    row = f"{'total':<16}{'':>7}{totals['bs4'] * 1000:>9.1f}"
+    for backend in backends:
+        row += f"{totals[backend] * 1000:>16.1f}{totals['bs4'] / totals[backend]:>6.1f}{'':>6}"
+    print(row)
+
+
+if __name__ == '__main__':
+    main()
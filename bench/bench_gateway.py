@@ -0,0 +1,172 @@
+"""End-to-end latency benchmark: gateway on a PTY against a local stub
+
+    python bench/bench_gateway.py                      # 9600 baud, defaults
+    python bench/bench_gateway.py --save results.json  # keep the numbers
+    python bench/bench_gateway.py --compare results.json
+
+Runs a fixed script of menu paths as the Game.com would (ATZ/ATDT,
+listings, paging, reading stories, typing a URL) and reports, per step,
+time to first byte, time until the full screen has arrived, and bytes on
+the wire, plus keystroke echo latency while typing. --compare flags steps
+that got more than --tolerance slower than a saved run.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from emulator import DeviceEmulator
+from stub_server import StubServer
+
+
+def make_gateway(args, port, stub):
+    options = {
+        'stream': args.stream,
+        'progressive': args.progressive,
+        'parser': args.parser,
+    }
+    if args.condense:
+        from condense import Condenser
+        options['condenser'] = Condenser(max_bytes=int(args.page_kb * 1024) or None)
+    if args.use_async:
+        from async_gateway import AsyncGameComGateway as cls
+    else:
+        from browser import GameComGateway as cls
+    from feeds import FeedStore, HackerNewsFeed, RedditFeed
+    from httpcache import HttpCache
+    http = HttpCache()
+    # The stub only serves HTML listings, so no JSON APIs
+    feeds = FeedStore([
+        HackerNewsFeed(http, stub.base + '/hn/', api=None),
+        RedditFeed(http, stub.base + '/reddit', api=False),
+    ])
+    gateway = cls(port=port, baudrate=args.baud, http=http, feeds=feeds, **options)
+    gateway.hn_base = stub.base + '/hn/'
+    if args.prefetch:
+        from prefetch import Prefetcher
+        gateway.prefetcher = Prefetcher(gateway.prefetch_page, top_n=args.prefetch)
+    return gateway
+
+
+def script(stub):
+    """(step name, line to send) in order; None means 'type a URL'"""
+    return [
+        ('dial', 'ATDT5551234'),
+        ('hn', '1'),
+        ('hn_next', 'N'),
+        ('story', '1'),
+        ('story_next', 'N'),
+        ('menu', 'M'),
+        ('hn_again', '1'),
+        ('story_again', '1'),
+        ('menu2', 'M'),
+        ('reddit', '2'),
+        ('reddit_story', '3'),
+        ('back', 'B'),  # to the Reddit listing
+        ('enter_url', 'U'),
+        ('typed_url', None),
+        ('menu3', 'M'),
+    ]
+
+
+def run(args):
+    stub = StubServer(latency=args.latency, rate=args.site_kbps * 1024).start()
+    device = DeviceEmulator(baud=args.baud, settle=args.settle)
+    gateway = make_gateway(args, device.port, stub)
+    threading.Thread(target=gateway.run, daemon=True).start()
+    time.sleep(0.3)
+
+    results = {}
+    echo = []
+    device.command('ATZ')
+    for name, line in script(stub):
+        if line is None:
+            url = stub.base[len('http://'):] + '/story/7'
+            echo.extend(device.type_keys(url))
+            timing = device.command('')
+        else:
+            timing = device.command(line)
+        results[name] = timing.as_dict()
+        if args.verbose:
+            print(timing.text)
+
+    device.close()
+    stub.stop()
+    echo = [x for x in echo if x is not None]
+    summary = {
+        'echo_ms_median': round(statistics.median(echo) * 1000, 2) if echo else None,
+        'echo_ms_max': round(max(echo) * 1000, 2) if echo else None,
+        'upstream_requests': stub.hits,
+    }
+    return {'config': vars(args), 'steps': results, 'summary': summary}
+
+
+def report(run_result, baseline=None, tolerance=0.1):
+    steps = run_result['steps']
+    old = baseline['steps'] if baseline else {}
+    print(f"{'step':<14}{'ttfb ms':>10}{'full ms':>10}{'bytes':>8}"
+          + (f"{'was ms':>10}{'':>4}" if baseline else ''))
+    regressions = 0
+    for name, step in steps.items():
+        row = f"{name:<14}{step['ttfb_ms'] or 0:>10.1f}{step['full_ms'] or 0:>10.1f}{step['bytes']:>8}"
+        if name in old and old[name]['full_ms']:
+            was = old[name]['full_ms']
+            flag = ''
+            if step['full_ms'] and step['full_ms'] > was * (1 + tolerance) and step['full_ms'] - was > 5:
+                flag = ' !!'
+                regressions += 1
+            row += f"{was:>10.1f}{flag:>4}"
+        print(row)
+    summary = run_result['summary']
+    print(f"\nkeystroke echo: median {summary['echo_ms_median']} ms, "
+          f"max {summary['echo_ms_max']} ms")
+    print(f"upstream requests: {summary['upstream_requests']}")
+    if baseline:
+        print(f"{regressions} step(s) more than {tolerance:.0%} slower than baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--async', dest='use_async', action='store_true')
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--progressive', action='store_true')
+    parser.add_argument('--parser', default='auto')
+    parser.add_argument('--prefetch', type=int, default=0)
+    parser.add_argument('--no-condense', dest='condense', action='store_false')
+    parser.add_argument('--page-kb', type=float, default=0)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='seconds the stub waits before answering')
+    parser.add_argument('--site-kbps', type=float, default=0,
+                        help='trickle stub pages out at this many KB/s (a slow site)')
+    parser.add_argument('--settle', type=float, default=0.3,
+                        help='quiet time that marks the end of a screen')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --save')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='print every screen')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    result = run(args)
+    regressions = report(result, baseline, args.tolerance)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Cold start to ATZ-ready, and resuming after the adapter is replugged
+
+    python bench/bench_startup.py               # threaded gateway
+    python bench/bench_startup.py --async --runs 10
+
+Starts browser.py as a fresh process on an emulated Game.com and times
+how long until it answers ATZ with OK: interpreter start, imports and
+opening the port. Then, once dialled in, "unplugs" the adapter (closes
+the PTY and points the port's path at a new one, as udev would after a
+replug) and times how long until the screen is back on the new one.
+"""
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from emulator import DeviceEmulator
+
+GATEWAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'browser.py')
+
+
+def relink(link, target):
+    tmp = link + '.new'
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+def seen(emulator, mark, needle, timeout):
+    """Wait for needle in the device's input; True if it came in time"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        with emulator.cond:
+            emulator.cond.wait(0.005)
+            data = b''.join(chunk for _, chunk in emulator.received[mark:])
+        if needle in data:
+            return True
+    return False
+
+
+def run_once(args, link):
+    """(ms to ATZ OK, ms the gateway reported, ms to redraw after a replug)"""
+    emulator = DeviceEmulator(baud=args.baud)
+    relink(link, emulator.port)
+    cmd = [sys.executable, GATEWAY, '--port', link, '--baud', str(args.baud)]
+    if args.use_async:
+        cmd.append('--async')
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True)
+    replugged = None
+    try:
+        # Opening the port flushes its input, so keep asking until answered
+        mark = emulator.mark()
+        while True:
+            emulator.send(b'ATZ\r')
+            if seen(emulator, mark, b'OK', 0.01):
+                break
+            if time.perf_counter() - start > args.timeout:
+                raise RuntimeError('no answer to ATZ')
+        ready = time.perf_counter() - start
+
+        emulator.command('ATDT5551234')
+        emulator.command('1')
+        replacement = DeviceEmulator(baud=args.baud)
+        relink(link, replacement.port)
+        mark = replacement.mark()
+        unplugged = time.perf_counter()
+        emulator.close()
+        if seen(replacement, mark, b'> ', args.timeout):
+            replugged = time.perf_counter() - unplugged
+        replacement.close()
+    finally:
+        proc.send_signal(signal.SIGINT)
+        try:
+            output = proc.communicate(timeout=10)[0]
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            output = proc.communicate()[0]
+        emulator.close()
+    if args.verbose:
+        print(output)
+    match = re.search(r'Ready in (\d+) ms', output)
+    reported = int(match.group(1)) if match else None
+    return ready * 1000, reported, replugged * 1000 if replugged is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('--async', dest='use_async', action='store_true')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=15.0)
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="print the gateway's console output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        link = os.path.join(tmp, 'ttyGAMECOM')
+        results = [run_once(args, link) for _ in range(args.runs)]
+
+    def median(column):
+        values = [row[column] for row in results if row[column] is not None]
+        return f'{statistics.median(values):7.0f} ms' if values else '      n/a'
+
+    print(f"{'gateway':<10}{'ATZ -> OK':>12}{'(reported)':>12}{'replug':>12}")
+    print(f"{'async' if args.use_async else 'threaded':<10}"
+          f"{median(0):>12}{median(1):>12}{median(2):>12}")
+    print(f'median of {args.runs} runs; reported is "Ready in" from the gateway, '
+          'timed from its first import')
+
+
+if __name__ == '__main__':
+    main()
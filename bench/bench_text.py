@@ -0,0 +1,93 @@
+"""Charset handling and ASCII output on big multilingual pages
+
+    python bench/bench_text.py
+
+For each page (encoded as a site would send it, the charset declared
+only in a <meta>), compares requests' statistical charset detection,
+which resp.text falls back on, with sniff_encoding(). Then compares the
+old device output, encode('ascii', 'ignore') on every send, with one
+to_ascii() pass over the distilled page: time, and characters that
+never reach the screen.
+"""
+import argparse
+import codecs
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bs4 import BeautifulSoup
+from charset_normalizer import from_bytes
+
+import corpus
+from encoding import sniff_encoding, to_ascii
+
+# How each language's pages are encoded on the wire
+CHARSETS = {'en': 'utf-8', 'fr': 'windows-1252', 'de': 'utf-8', 'ru': 'windows-1251',
+            'el': 'iso-8859-7', 'vi': 'utf-8', 'ja': 'shift_jis'}
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def pages(seed=1997):
+    rng = random.Random(seed)
+    for lang, charset in CHARSETS.items():
+        html = corpus.multilingual_page(rng, lang)
+        html = html.replace('<head>', f'<head><meta charset="{charset}">', 1)
+        # Characters the charset can't hold go out as numeric references
+        yield lang, charset, html, html.encode(charset, 'xmlcharrefreplace')
+
+
+def guess(body):
+    match = from_bytes(body).best()
+    return match.encoding if match else 'utf-8'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'page':<6}{'KB':>6}{'guess ms':>10}{'ok':>4}{'sniff ms':>10}{'ok':>4}"
+          f"{'ignore ms':>11}{'lost':>8}{'ascii ms':>10}{'?':>6}")
+    for lang, charset, html, body in pages():
+        t_guess, guessed = best_of(lambda: guess(body), args.repeat)
+        t_sniff, sniffed = best_of(lambda: sniff_encoding(body[:1024], 'text/html'),
+                                   args.repeat)
+        soup = BeautifulSoup(body.decode(sniffed, 'replace'), 'html.parser')
+        paragraphs = [p.get_text() for p in soup.find_all('p')]
+
+        def per_send():
+            # Old: every screen encoded (and non-ASCII dropped) as it's sent
+            return [p.encode('ascii', 'ignore') for p in paragraphs]
+
+        t_ignore, _ = best_of(per_send, args.repeat)
+        t_ascii, converted = best_of(lambda: [to_ascii(p) for p in paragraphs],
+                                     args.repeat)
+        lost = sum(len(p) - len(p.encode('ascii', 'ignore')) for p in paragraphs)
+        unknown = sum(p.count('?') for p in converted)
+        print(f"{lang:<6}{len(body) / 1024:>6.0f}{t_guess * 1000:>10.1f}"
+              f"{'yes' if same_codec(guessed, charset) else 'no':>4}"
+              f"{t_sniff * 1000:>10.3f}{'yes' if same_codec(sniffed, charset) else 'no':>4}"
+              f"{t_ignore * 1000:>11.2f}{lost:>8}{t_ascii * 1000:>10.2f}{unknown:>6}")
+
+
+def same_codec(a, b):
+    try:
+        return codecs.lookup(a).name == codecs.lookup(b).name
+    except LookupError:
+        return False
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Check that HttpClient's cached DNS doesn't leak into Host, SNI or certs
+
+    python bench/check_http.py
+
+Fetches from local servers by the name localhost (which the DNS cache
+turns into 127.0.0.1 for the socket):
+- plain HTTP three times over one kept-alive connection: every request
+  must carry Host: localhost:PORT;
+- HTTPS with a throwaway self-signed certificate for localhost (made
+  with the openssl command): must verify, which needs SNI and the
+  certificate check to see the name, not the address.
+Exits non-zero on failure.
+"""
+import http.server
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from httpclient import HttpClient, connector
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hosts = []
+    sni = []
+
+    def do_GET(self):
+        self.hosts.append(self.headers.get('Host'))
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def make_cert(tmp):
+    cert = os.path.join(tmp, 'cert.pem')
+    key = os.path.join(tmp, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                    '-keyout', key, '-out', cert, '-days', '1', '-subj', '/CN=localhost',
+                    '-addext', 'subjectAltName=DNS:localhost'],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+def check_host_header(client):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    port = serve(server)
+    Handler.hosts = []
+    for _ in range(3):
+        client.get(f'http://localhost:{port}/').close()
+    server.shutdown()
+    expected = [f'localhost:{port}'] * 3
+    ok = Handler.hosts == expected
+    print(f"{'ok ' if ok else 'FAIL'} Host headers {Handler.hosts}")
+    return ok
+
+
+def check_https(client, tmp):
+    cert, key = make_cert(tmp)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    context.sni_callback = lambda sock, name, ctx: Handler.sni.append(name)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    port = serve(server)
+    Handler.sni = []
+    try:
+        for _ in range(2):
+            resp = client.get(f'https://localhost:{port}/', verify=cert)
+            resp.close()
+        ok = resp.status_code == 200 and Handler.sni[:1] == ['localhost']
+        detail = f'status {resp.status_code}, SNI {Handler.sni}'
+    except Exception as e:
+        ok = False
+        detail = f'{type(e).__name__}: {e}'
+    server.shutdown()
+    print(f"{'ok ' if ok else 'FAIL'} HTTPS fetch ({detail})")
+    return ok
+
+
+def main():
+    client = HttpClient(retries=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [check_host_header(client), check_https(client, tmp)]
+    print(client.summary())
+    # The checks are only meaningful if the cache handed out the address
+    if not connector.hits:
+        print('FAIL DNS cache was never used')
+        results.append(False)
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
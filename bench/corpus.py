@@ -0,0 +1,144 @@
+"""Synthetic pages shaped like the sites people browse from a Game.com
+
+Deterministic (seeded), so timings are comparable between runs. Saved
+real pages can be used instead with --corpus DIR.
+"""
+import random
+
+WORDS = ('the of and to in is that for it as was with on by at this from '
+         'network modem handheld screen battery signal browser cartridge '
+         'retro serial gateway protocol server pixel display keyboard '
+         'article story comment update release kernel patch memory').split()
+
+
+def sentence(rng, n=None):
+    n = n or rng.randint(6, 24)
+    words = [rng.choice(WORDS) for _ in range(n)]
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph(rng, sentences=None):
+    return ' '.join(sentence(rng) for _ in range(sentences or rng.randint(2, 6)))
+
+
+def chrome(rng, links=60):
+    """Navigation, header, footer and scripts every real page carries"""
+    nav = ''.join(f'<li><a href="/section/{i}">Section {i}</a></li>'
+                  for i in range(links))
+    script = 'var x = {};' * 200
+    return (f'<header><h1>Site</h1><nav><ul>{nav}</ul></nav></header>'
+            f'<script>{script}</script><style>.a{{color:red}}</style>',
+            f'<footer><p>Copyright notice and legal text for the site.</p>'
+            f'<nav>{nav}</nav></footer>')
+
+
+# What a news site wraps every article in, inside the <article> where the
+# extractor can't tell it from the story
+FURNITURE = (
+    'By Staff Reporter | Updated {} hours ago | {} min read',
+    'We use cookies to improve your experience. By continuing to browse '
+    'you accept our cookie policy.',
+    'Share this article:  Facebook  |  Twitter  |  Email  |  Copy link',
+)
+NEWSLETTER = ('Sign up for our daily newsletter to get the top stories in your '
+              'inbox every morning!!!')
+
+
+def news_article(rng, paragraphs=30):
+    top, bottom = chrome(rng)
+    # Source HTML is hard-wrapped and indented, like most CMS templates emit
+    body = ''.join(
+        f'<p>\n      {paragraph(rng)}\n      <a href="/story/{rng.randint(1, 9999)}">'
+        f'{sentence(rng, 4)}</a>\n    </p>' for _ in range(paragraphs))
+    furniture = ''.join(f'<p>{text.format(rng.randint(1, 9), rng.randint(2, 9))}</p>'
+                        for text in FURNITURE)
+    # The newsletter pitch halfway down, and again at the end
+    middle = body.index('<p>', len(body) // 2)
+    body = (furniture + body[:middle] + f'<p>{NEWSLETTER}</p>' + body[middle:] +
+            f'<p>{NEWSLETTER}</p>')
+    sidebar = ''.join(f'<div class="widget"><a href="/ad/{i}">Ad {i}</a></div>'
+                      for i in range(40))
+    return (f'<html><head><title>{sentence(rng, 6)}</title></head><body>{top}'
+            f'<div class="sidebar">{sidebar}</div>'
+            f'<article><h2>{sentence(rng, 8)}</h2>{body}</article>{bottom}'
+            f'</body></html>')
+
+
+def wiki_page(rng, sections=25):
+    top, bottom = chrome(rng, links=150)
+    body = ''
+    for i in range(sections):
+        body += f'<h2>Section {i}</h2>'
+        for _ in range(rng.randint(2, 5)):
+            refs = ''.join(f'<sup><a href="#cite-{rng.randint(1, 300)}">[{j}]</a></sup>'
+                           for j in range(rng.randint(0, 3)))
+            body += f'<p>{paragraph(rng)}{refs} <a href="/wiki/{rng.choice(WORDS)}_{i}">{rng.choice(WORDS)}</a></p>'
+        body += '<table>' + '<tr><td>cell</td><td>data</td></tr>' * 10 + '</table>'
+    return (f'<html><head><title>{sentence(rng, 3)} - Wiki</title></head><body>{top}'
+            f'<div id="bodyContent" class="mw-body-content">{body}</div>{bottom}'
+            f'</body></html>')
+
+
+def listing(rng, items=30):
+    """Link-heavy page with no <p> (forces the text-chunk fallback)"""
+    rows = ''.join(
+        f'<tr class="athing"><td><span class="titleline">'
+        f'<a href="https://example.com/{i}">{sentence(rng, 7)}</a></span></td></tr>'
+        f'<tr><td class="subtext">{rng.randint(1, 500)} points by user{i} | '
+        f'<a href="item?id={i}">{rng.randint(0, 300)} comments</a></td></tr>'
+        for i in range(items))
+    return (f'<html><head><title>Listing</title></head><body>'
+            f'<table>{rows}</table></body></html>')
+
+
+def huge_page(rng):
+    """Multi-megabyte page, mostly markup the gateway never shows"""
+    top, bottom = chrome(rng, links=400)
+    body = ''.join(f'<div class="card"><div><span>{sentence(rng)}</span></div></div>'
+                   for _ in range(6000))
+    text = ''.join(f'<p>{paragraph(rng)}</p>' for _ in range(200))
+    return (f'<html><head><title>Huge</title></head><body>{top}{body}'
+            f'<main>{text}</main>{bottom}</body></html>')
+
+
+# A few languages' words, for pages the ASCII-only display has to cope with
+LANGUAGES = {
+    'en': WORDS,
+    'fr': ("le réseau était déjà très rapide après l'été où les élèves ont créé "
+           "ça pour la première fois à côté du château").split(),
+    'de': ("die Straße über Größe schön Müller früh Änderung Bücher weiß "
+           "Überblick Fußgänger Bildschirm Tastatur").split(),
+    'ru': ("сеть модем экран батарея сигнал браузер картридж сервер ядро "
+           "память клавиатура обновление статья").split(),
+    'el': ("δίκτυο οθόνη μπαταρία σήμα πρόγραμμα περιήγησης διακομιστής "
+           "πληκτρολόγιο μνήμη άρθρο").split(),
+    'vi': ("mạng màn hình pin tín hiệu trình duyệt máy chủ bàn phím bộ nhớ "
+           "bài viết cập nhật").split(),
+    'ja': "ネットワーク 画面 電池 信号 ブラウザ サーバー 記事 更新".split(),
+}
+# Typography that turns up in any language
+MARKS = ['“', '”', '’', ' — ', '–', '…', '\xa0', ' 👍', ' €5']
+
+
+def multilingual_page(rng, lang, paragraphs=400):
+    """Long article in one of LANGUAGES, curly quotes and emoji included"""
+    words = LANGUAGES[lang]
+    body = ''
+    for _ in range(paragraphs):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(30, 80)))
+        marks = ''.join(rng.choice(MARKS) for _ in range(3))
+        body += f'<p>{text}{marks} {text[:40]}.</p>'
+    return (f'<html><head><title>{" ".join(words[:4])}</title></head><body>'
+            f'<article>{body}</article></body></html>')
+
+
+def build(seed=1997):
+    """[(name, html)] for the default benchmark corpus"""
+    rng = random.Random(seed)
+    return [
+        ('news-short', news_article(rng, 8)),
+        ('news-long', news_article(rng, 60)),
+        ('wiki', wiki_page(rng)),
+        ('listing', listing(rng)),
+        ('huge', huge_page(rng)),
+    ]
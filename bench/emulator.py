@@ -0,0 +1,134 @@
+"""Game.com stand-in: drives a gateway over a pseudo-terminal
+
+The gateway opens the slave side of a PTY as if it were /dev/ttyUSB0;
+the emulator reads and writes the master side like the handheld would.
+
+A PTY moves bytes instantly, so the emulator models the serial wire: each
+chunk is timestamped with when its last byte would have arrived at baud
+(8N1), given everything still queued ahead of it.
+"""
+import os
+import pty
+import select
+import threading
+import time
+import tty
+
+
+class ScreenTiming:
+    """What one command cost, as seen from the device"""
+
+    def __init__(self, ttfb, full, nbytes, text):
+        self.ttfb = ttfb
+        self.full = full
+        self.nbytes = nbytes
+        self.text = text
+
+    def as_dict(self):
+        return {
+            'ttfb_ms': round(self.ttfb * 1000, 1) if self.ttfb is not None else None,
+            'full_ms': round(self.full * 1000, 1) if self.full is not None else None,
+            'bytes': self.nbytes,
+        }
+
+
+class DeviceEmulator:
+    """Scripted Game.com on the master end of a PTY"""
+
+    PROMPTS = (b'> ', b'URL> ')
+
+    def __init__(self, baud=9600, settle=0.3, timeout=30.0):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.byte_time = 10.0 / baud
+        self.settle = settle
+        self.timeout = timeout
+        self.wire_free = 0.0
+        self.received = []  # (arrival time at the device, bytes)
+        self.cond = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self.reader, daemon=True)
+        self.thread.start()
+
+    def reader(self):
+        while self.running:
+            # Polled, so close() can join this thread: a thread blocked in
+            # read() keeps the master open, and the gateway sees no hangup
+            if not select.select([self.master], [], [], 0.05)[0]:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            now = time.perf_counter()
+            with self.cond:
+                done = max(now, self.wire_free) + len(data) * self.byte_time
+                self.wire_free = done
+                self.received.append((done, data))
+                self.cond.notify_all()
+
+    def mark(self):
+        with self.cond:
+            return len(self.received)
+
+    def output_since(self, mark):
+        with self.cond:
+            return list(self.received[mark:])
+
+    def send(self, data):
+        os.write(self.master, data)
+
+    def command(self, line):
+        """Send line + CR and wait for the screen it produces"""
+        mark = self.mark()
+        start = time.perf_counter()
+        self.send(line.encode('ascii') + b'\r')
+        return self.wait_screen(mark, start)
+
+    def wait_screen(self, mark, start):
+        """Wait until a prompt has been sent and the link has gone quiet"""
+        deadline = start + self.timeout
+        while True:
+            with self.cond:
+                self.cond.wait(0.02)
+                chunks = self.received[mark:]
+            data = b''.join(chunk for _, chunk in chunks)
+            now = time.perf_counter()
+            quiet = chunks and now - chunks[-1][0] >= self.settle
+            if (quiet and data.endswith(self.PROMPTS)) or now > deadline:
+                break
+        ttfb = (chunks[0][0] - len(chunks[0][1]) * self.byte_time + self.byte_time
+                - start) if chunks else None
+        full = chunks[-1][0] - start if chunks else None
+        return ScreenTiming(ttfb, full, len(data), data.decode('ascii', 'replace'))
+
+    def type_keys(self, text, gap=0.05):
+        """Type text one key at a time; returns echo latency per key"""
+        latencies = []
+        for char in text:
+            mark = self.mark()
+            start = time.perf_counter()
+            self.send(char.encode('ascii'))
+            latency = None
+            deadline = start + 2.0
+            while time.perf_counter() < deadline:
+                with self.cond:
+                    self.cond.wait(0.005)
+                    chunks = self.received[mark:]
+                if char.encode('ascii') in b''.join(chunk for _, chunk in chunks):
+                    latency = chunks[-1][0] - start
+                    break
+            latencies.append(latency)
+            time.sleep(gap)
+        return latencies
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
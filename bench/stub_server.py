@@ -0,0 +1,97 @@
+"""Local HTTP stub standing in for Hacker News, Reddit and article sites
+
+Pages come from the seeded synthetic corpus, with the HN and Reddit
+listings using the same markup (.titleline, .thing .title) the gateway
+scrapes. Every story links back to an article on the stub.
+"""
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import corpus
+
+
+def hn_listing(rng, base, stories=30):
+    rows = ''.join(
+        f'<tr class="athing"><td class="title"><span class="titleline">'
+        f'<a href="{base}/story/{i}">{corpus.sentence(rng, 7)}</a></span></td></tr>'
+        f'<tr><td class="subtext">{rng.randint(1, 500)} points | '
+        f'<a href="item?id={i}">{rng.randint(0, 300)} comments</a></td></tr>'
+        for i in range(stories))
+    return (f'<html><head><title>Hacker News</title></head><body>'
+            f'<table id="hnmain">{rows}</table></body></html>')
+
+
+def reddit_listing(rng, base, posts=25):
+    things = ''.join(
+        f'<div class="thing"><p class="title"><a class="title" href="{base}/story/{100 + i}">'
+        f'{corpus.sentence(rng, 9)}</a></p><ul class="flat-list buttons">'
+        f'<li><a href="/comments/{i}">{rng.randint(0, 900)} comments</a></li></ul></div>'
+        for i in range(posts))
+    return (f'<html><head><title>technology</title></head><body>'
+            f'<div id="siteTable">{things}</div></body></html>')
+
+
+class StubServer:
+    """Serves /hn/, /reddit, and /story/N on 127.0.0.1 in a thread"""
+
+    def __init__(self, seed=1997, latency=0.0, rate=0):
+        self.latency = latency
+        # Bytes per second for page bodies (0: as fast as possible)
+        self.rate = rate
+        self.hits = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.server.daemon_threads = True
+
+        rng = random.Random(seed)
+        self.pages = {
+            '/hn/': hn_listing(rng, self.base).encode(),
+            '/reddit': reddit_listing(rng, self.base).encode(),
+        }
+        shapes = [corpus.news_article, corpus.wiki_page, corpus.news_article]
+        for i in range(130):
+            self.pages[f'/story/{i}'] = shapes[i % len(shapes)](rng).encode()
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = stub.pages.get(self.path.split('?')[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not stub.rate:
+                    self.wfile.write(body)
+                    return
+                # A slow site: the body trickles out
+                for start in range(0, len(body), 2048):
+                    self.wfile.write(body[start:start + 2048])
+                    self.wfile.flush()
+                    time.sleep(2048 / stub.rate)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
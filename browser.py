@@ -1,51 +1,122 @@
+# First, so registry.started times the cold start from here (see
+# report_ready()); requests, bs4 and lxml wait until a page needs them
+import metrics
 import serial
 import time
 import threading
-import requests
-from bs4 import BeautifulSoup
-import textwrap
-import re
-from urllib.parse import urlparse, urljoin
+import queue
+import codecs
+from urllib.parse import urlparse
+from transport import FrameWriter, requested_rate
+from session import Session, session_property
+from httpcache import HttpCache
+from ports import KNOWN_ADAPTERS, find_port, parse_usb_id
+from encoding import sniff_encoding
+from pagecache import PageCache, content_hash
+from extract import PageExtractor, distill, resolve_backend
+from layout import ScreenLayout
+from feeds import FeedStore, HackerNewsFeed, RedditFeed
+from searchindex import SearchIndex
+from condense import Condenser
+from progressive import ProgressiveLoad
+
+
+class FetchError(Exception):
+    """Upstream answered, but not with something we can show"""
+
 
 class GameComGateway:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=9600):
-        self.ser = serial.Serial(port, baudrate, timeout=0.1)
-        self.ser.dtr = True
-        self.ser.rts = True
-        self.connected = False
-        self.buffer = ""
-        self.current_menu = "main"
-        self.hn_stories = []
-        self.hn_links = []
-        self.reddit_posts = []
-        self.reddit_titles = []
-        self.awaiting_url = False
-        self.current_links = []
-        self.current_content = []
-        self.current_url = ""
-        self.page = 0
+    # Feed sources (overridable, e.g. to point the benchmarks at a stub)
+    hn_base = 'https://news.ycombinator.com/'
+    reddit_feed = 'https://old.reddit.com/r/technology'
+    
+    # Seconds between attempts to (re)open a missing serial port
+    reconnect_interval = 1.0
+    
+    def __init__(self, port=None, baudrate=9600, ser=None,
+                 session=None, http=None, pages=None, prefetcher=None,
+                 stream=False, stream_max_bytes=256 * 1024,
+                 stream_max_seconds=8.0, parser='auto', parse_pool=None,
+                 rows=12, flow='none', feeds=None, pack=None, search=None,
+                 progressive=False, usb_ids=None, condenser=None):
+        # The port is opened by run() (see open_port), and reopened if the
+        # adapter is unplugged; the session carries on across that. With
+        # usb_ids it is found by USB VID:PID, falling back to port.
+        self.port = port
+        self.usb_ids = usb_ids
+        self.baudrate = baudrate
+        self.ser = ser
+        self.out = FrameWriter(ser, baudrate, flow=flow)
+        # Line rate asked for with AT+MS, reported and used on CONNECT
+        self.requested_rate = None
+        # Browsing state (menu, page, links, ...) lives on the session
+        self.session = session or Session()
+        # Anything with the requests.get() signature; normally an HttpCache,
+        # shared between sessions by the multi-port gateway
+        self.http = http or HttpCache()
+        # Distilled pages, so revisits skip parsing
+        self.pages = pages or PageCache()
+        # HN/Reddit listings, refreshed in the background once run() starts
+        self.feeds = feeds or FeedStore([
+            HackerNewsFeed(self.http, self.hn_base),
+            RedditFeed(self.http, self.reddit_feed),
+        ])
+        # Optional SitePack: prebuilt pages served without going online
+        self.pack = pack
+        if pack:
+            for name in self.feeds.feeds:
+                listing = pack.feed(name)
+                if listing:
+                    self.feeds.seed(name, *listing)
+        # Full-text index of pages read or prefetched, for the Search menu
+        self.search = search or SearchIndex()
+        # Optional Prefetcher, warms the caches with likely next pages
+        self.prefetcher = prefetcher
+        # Streaming fetch: parse while downloading, stop once the page has
+        # enough to show or a budget runs out
+        self.stream = stream
+        self.stream_max_bytes = stream_max_bytes
+        self.stream_max_seconds = stream_max_seconds
+        # Progressive fetch: show a page's first screen as soon as it has
+        # arrived, and load the rest behind it
+        self.progressive = progressive
+        # Optional Condenser: drops boilerplate and repeats, tidies text and
+        # applies the per-article byte budget before a page is shown
+        self.condenser = condenser
+        # HTML parser backend: lxml or html.parser (auto picks the fastest
+        # installed), or bs4 for the original BeautifulSoup pipeline
+        self.parser = resolve_backend(parser)
+        # Optional ParsePool: distill big pages in worker processes
+        self.parse_pool = parse_pool
         self.items_per_page = 5
-        self.viewing_links = False
+        # Wraps and paginates once per page/listing; N/P replays frames
+        self.layout = ScreenLayout(width=30, rows=rows)
+        self.log_prefix = ''
+        # Completed input lines, when a reader thread feeds the main loop
+        self.commands = None
         
     def send(self, text):
-        """Send text to Game.com"""
-        self.ser.write(text.encode('ascii', errors='ignore'))
-        time.sleep(0.05)
+        """Queue text for the Game.com (sent on the next flush)"""
+        self.out.write(text.encode('ascii', errors='ignore'))
+    
+    def flush(self, report=True):
+        """Send everything queued so far as one frame"""
+        with metrics.span('serial.send'):
+            sent = self.out.flush()
+        metrics.count('serial.bytes', sent)
+        if sent and report:
+            print(f"{self.log_prefix}>> {sent} bytes in "
+                  f"{self.out.last_seconds:.2f}s "
+                  f"({self.out.bytes_per_second:.0f} B/s avg)")
         
+    def echo(self, text):
+        """Echo typed characters right away, ahead of queued output"""
+        self.out.echo(text.encode('ascii', errors='ignore'))
+    
     def send_line(self, text):
         """Send line with CR LF"""
         self.send(text + '\r\n')
     
-    def wrap_text(self, text, width=30, first_line_indent=''):
-        """Wrap text without subsequent indentation"""
-        wrapped = textwrap.fill(text, 
-                            width=width,
-                            initial_indent=first_line_indent,
-                            subsequent_indent='',
-                            break_long_words=True)
-        # Replace \n with \r\n for proper carriage return on serial terminals
-        return wrapped.replace('\n', '\r\n')
-    
     def validate_url(self, url):
         """Basic URL validation"""
         if not url.startswith(('http://', 'https://')):
@@ -60,77 +131,25 @@ class GameComGateway:
         except Exception as e:
             return False, str(e)
     
-    def extract_links(self, soup, base_url):
-        """Extract links from page"""
-        links = []
-        seen_urls = set()
-        
-        for link in soup.find_all('a', href=True):
-            href = link.get('href')
-            text = link.get_text().strip()
-            
-            if not href or href.startswith('#') or href.startswith('javascript:'):
-                continue
-            
-            try:
-                absolute_url = urljoin(base_url, href)
-            except:
-                continue
-            
-            if absolute_url in seen_urls:
-                continue
-            
-            seen_urls.add(absolute_url)
-            
-            if not text:
-                text = href
-            text = text[:40]
-            
-            links.append({
-                'url': absolute_url,
-                'text': text
-            })
-            
-            if len(links) >= 20:
-                break
-        
-        return links
-    
     def show_content_page(self):
         """Show current page of article content"""
-        if not self.current_content:
+        with metrics.span('layout.content'):
+            frames = self.content_frames()
+        if not frames:
             self.send_line('\r\nNo content available')
             self.viewing_links = True
             self.page = 0
             self.show_links_section()
             return
         
-        total_pages = len(self.current_content)
-        current_page = self.page + 1
-        
-        self.send_line(f'\r\nContent {current_page}/{total_pages}\r\n')
-        
-        # Show current paragraph
-        text = self.current_content[self.page]
-        wrapped = self.wrap_text(text, width=30)
-        self.send_line(wrapped)
-        self.send_line('')
-        
-        # Show navigation
-        if self.page < len(self.current_content) - 1:
-            self.send_line('N. Next')
-        else:
-            # Last page of content
-            if self.current_links:
-                self.send_line('N. View Links')
-            else:
-                self.send_line('(End of content)')
-        
-        if self.page > 0:
-            self.send_line('P. Previous')
-        
-        self.send_line('U. New URL  M. Menu')
-        self.send('> ')
+        self.page = min(self.page, len(frames) - 1)
+        self.out.write(frames[self.page])
+    
+    def content_frames(self):
+        """Screens of the current page's content, laid out once"""
+        return self.layout.content_frames(self.current_content,
+                                          bool(self.current_links),
+                                          partial=self.loading is not None)
     
     def show_links_section(self):
         """Show links section with pagination"""
@@ -150,131 +169,397 @@ class GameComGateway:
     
     def show_paginated_items(self, items, item_type="items"):
         """Show a page of items with pagination controls"""
-        start_idx = self.page * self.items_per_page
-        end_idx = start_idx + self.items_per_page
-        page_items = items[start_idx:end_idx]
-        
-        total_pages = (len(items) + self.items_per_page - 1) // self.items_per_page
-        current_page_num = self.page + 1
+        with metrics.span('layout.items'):
+            frames = self.layout.item_frames(items, self.items_per_page)
+        self.page = min(self.page, len(frames) - 1)
+        self.out.write(frames[self.page])
+    
+    def fetch_url(self, url):
+        """Fetch and display arbitrary URL"""
+        url = self.begin_fetch_url(url)
+        if not url:
+            return
+        if self.progressive:
+            self.fetch_progressively(url)
+            return
         
-        self.send_line(f'\r\nPage {current_page_num}/{total_pages}\r\n')
+        try:
+            page = self.load_page(url)
+        except Exception as e:
+            metrics.count('fetch.errors')
+            self.show_fetch_error(e)
+            return
         
-        for i, item in enumerate(page_items, start=start_idx + 1):
-            if isinstance(item, dict):
-                text = f"{i}. {item['text']}"
-            else:
-                text = f"{i}. {item}"
-            
-            wrapped = self.wrap_text(text, width=30)
-            self.send_line(wrapped)
-            self.send_line('')
+        self.show_page(page)
+    
+    def fetch_progressively(self, url):
+        """Show url's first screen as soon as it has arrived
         
-        nav_options = []
-        if self.page > 0:
-            nav_options.append('P. Previous')
-        if end_idx < len(items):
-            nav_options.append('N. Next')
+        The rest of the page loads on a worker thread; commands that need
+        it wait for it in settle_loading().
+        """
+        loading = self.start_loading(url)
+        loading.ready.wait()
+        self.show_loading(loading)
+    
+    def start_loading(self, url):
+        """Start a ProgressiveLoad of url (a screenful of text makes it ready)"""
+        min_chars = self.layout.rows * self.layout.width
+        return ProgressiveLoad(url, min_chars).start(self.load_page)
+    
+    def show_loading(self, loading):
+        """Show a ready ProgressiveLoad: the whole page, or its first screen"""
+        if loading.page is not None:
+            self.show_page(loading.page)
+        elif loading.preview is not None:
+            # Frames are marked partial while self.loading is set
+            self.loading = loading
+            self.show_page(loading.preview, partial=True)
+        else:
+            metrics.count('fetch.errors')
+            self.show_fetch_error(loading.error)
+    
+    def settle_loading(self, line):
+        """Deal with the page loading behind the screen before running line
         
-        if nav_options:
-            self.send_line(' | '.join(nav_options))
+        Leaving the page drops it (the download still lands in the HTTP
+        cache, and Back loads the whole page from there); N past the
+        screens already shown waits for the rest; anything else goes
+        ahead on what has arrived. Returns False if line has to wait
+        until the rest is in.
+        """
+        loading = self.loading
+        if loading is None:
+            return True
+        command = line.upper()
+        if command in ('M', 'U', 'S', 'B') or self.current_menu != "page":
+            if loading.done.is_set():
+                # In already: leave the whole page behind, not its preview
+                self.finish_loading(loading)
+            self.loading = None
+            return True
+        if not loading.done.is_set():
+            if command != 'N' or self.page + 1 < len(self.content_frames()):
+                return True
+            if not self.wait_for_rest(loading, line):
+                return False
+        self.finish_loading(loading)
+        return True
     
-    def fetch_url(self, url):
-        """Fetch and display arbitrary URL"""
+    def wait_for_rest(self, loading, line):
+        """Block until the rest of the page is in; True to go on with line"""
+        self.send_line('\r\nLoading rest of page...')
+        self.flush()
+        with metrics.span('fetch.rest_wait'):
+            loading.done.wait()
+        return True
+    
+    def finish_loading(self, loading):
+        """Swap the whole page in for the first screens it was shown from"""
+        self.loading = None
+        if loading.page is None:
+            # Failed part way: keep reading what did arrive
+            metrics.count('fetch.errors')
+            print(f"{self.log_prefix}Rest of {loading.url} failed: {loading.error}")
+            return
+        self.set_current_page(self.condense(loading.page))
+        self.search.add(loading.page)
+    
+    def begin_fetch_url(self, url):
+        """Validate a URL and tell the user we're fetching it
+        
+        Returns the normalized URL, or None if it was rejected.
+        """
         valid, result = self.validate_url(url)
         
         if not valid:
             self.send_line(f'\r\nError: {result}')
             self.send_line('Try again or M for menu')
             self.send('URL> ')
-            return
+            return None
+        
+        self.send_line(f'\r\nFetching...')
+        self.flush()
+        return result
+    
+    def load_page(self, url, on_progress=None):
+        """Download and distill a page into title, paragraphs and links
+        
+        Doesn't touch gateway state, so it is safe to run off the main loop.
+        With on_progress the page is streamed, and previews are passed to it
+        as they arrive (see stream_page).
+        """
+        if self.pack:
+            with metrics.span('fetch.pack'):
+                page = self.pack.get(url)
+            if page is not None:
+                return page
+        with metrics.span('fetch.total'):
+            if self.prefetcher:
+                # Joins the prefetch of url if one is running
+                with metrics.span('fetch.prefetch_wait'):
+                    self.prefetcher.claim(self.session, url)
+            if on_progress is not None:
+                # Stream budgets only apply if streaming was asked for
+                return self.stream_page(url, on_progress, limited=self.stream)[0]
+            if self.stream:
+                return self.stream_page(url)[0]
+            return self.distill_response(url, self.download_page(url))
+    
+    def download_page(self, url, stream=False):
+        """GET a page, raising FetchError for anything but 200"""
+        with metrics.span('fetch.http'):
+            # User-Agent and timeouts come from the HttpClient
+            resp = self.http.get(url, allow_redirects=True, stream=stream)
+        
+        if resp.status_code != 200:
+            resp.close()
+            raise FetchError(f'HTTP Error {resp.status_code}')
+        return resp
+    
+    def stream_page(self, url, on_progress=None, limited=True):
+        """Distill a page while it downloads; returns (page, bytes read)
+        
+        Stops reading as soon as the extractor has enough paragraphs and
+        links, or after stream_max_bytes / stream_max_seconds, unless
+        limited is false. on_progress(preview) is called after each chunk
+        until it returns True.
+        """
+        resp = self.download_page(url, stream=True)
+        start = time.perf_counter()
+        if not hasattr(resp, 'iter_content'):
+            # Served whole from the HTTP cache
+            return self.distill_response(url, resp), 0
+        
+        content_type = resp.headers.get('content-type', '').lower()
+        if content_type and 'html' not in content_type:
+            resp.close()
+            raise FetchError('Not a web page')
         
-        url = result
-        self.current_url = url
         
+        if limited:
+            extractor = PageExtractor(url, backend=self.parser)
+            max_bytes = self.stream_max_bytes
+            deadline = time.monotonic() + self.stream_max_seconds
+        else:
+            # The whole page, exactly as distill() would see it
+            extractor = PageExtractor(url, max_paragraphs=None, backend=self.parser,
+                                      max_fallback_chars=None)
+            max_bytes = deadline = float('inf')
+        # Small reads while a preview is wanted, so it isn't held up
+        chunk_size = 8192 if on_progress is None else 2048
+        decoder = None
+        parts = []
+        received = 0
+        complete = True
         try:
-            self.send_line(f'\r\nFetching...')
-            
-            resp = requests.get(
-                url, 
-                headers={'User-Agent': 'GameCom/1.0 (Retro Browser)'},
-                timeout=15,
-                allow_redirects=True
-            )
-            
-            if resp.status_code != 200:
-                self.send_line(f'\r\nHTTP Error {resp.status_code}')
-                self.send_line('M. Main Menu')
+            for chunk in resp.iter_content(chunk_size):
+                if decoder is None:
+                    # Charset from the header, or a <meta> in the first chunk
+                    decoder = codecs.getincrementaldecoder(
+                        sniff_encoding(chunk, content_type))('replace')
+                received += len(chunk)
+                text = decoder.decode(chunk)
+                parts.append(text)
+                extractor.feed(text)
+                if on_progress is not None and on_progress(extractor.preview()):
+                    on_progress = None
+                if (extractor.done or received >= max_bytes or
+                        time.monotonic() > deadline):
+                    complete = False
+                    break
+            else:
+                if decoder is not None:
+                    extractor.feed(decoder.decode(b'', True))
+        finally:
+            resp.close()
+            # Download and parse are interleaved, so they're timed together
+            metrics.observe('fetch.stream', time.perf_counter() - start)
+        
+        if not complete:
+            print(f"{self.log_prefix}Stopped reading {url} after {received} bytes")
+        # Whole bodies go into the HTTP cache like any other response (if
+        # self.http is one; a plain requests.get has nowhere to keep them)
+        html = ''.join(parts)
+        remember = getattr(self.http, 'remember', None)
+        if remember is not None:
+            remember(url, resp, html, received, complete)
+        page = extractor.page()
+        if not limited:
+            self.pages.put(url, content_hash(html), page)
+        return page, received
+    
+    def distill_response(self, url, resp):
+        """Distilled page for a response, from the page cache if possible"""
+        html = resp.text
+        digest = content_hash(html)
+        page = self.pages.get(url, digest)
+        if page is None:
+            with metrics.span('fetch.parse'):
+                page = self.distill_page(html, url)
+            self.pages.put(url, digest, page)
+        return page
+    
+    def prefetch_page(self, url):
+        """Warm the caches with url; returns bytes downloaded"""
+        if self.pack and self.pack.get(url) is not None:
+            return 0
+        if self.stream:
+            page, received = self.stream_page(url)
+        else:
+            resp = self.download_page(url)
+            page = self.distill_response(url, resp)
+            received = len(resp.text)
+        self.search.add(page)
+        if self.condenser:
+            # Sibling pages show what the site repeats on every page
+            self.condenser.learn(page)
+        return received
+    
+    def prefetch(self, urls):
+        """Start prefetching the first few of urls, if prefetch is on"""
+        if not self.prefetcher:
+            return
+        targets = []
+        for url in urls:
+            valid, result = self.validate_url(url)
+            if valid:
+                targets.append(result)
+        self.prefetcher.schedule(self.session, targets)
+    
+    def distill_page(self, html, url):
+        """Parse HTML into title, content paragraphs and links"""
+        if self.parse_pool:
+            return self.parse_pool.distill(html, url, self.parser, owner=self.session)
+        return distill(html, url, self.parser)
+    
+    @metrics.timed('show.page')
+    def show_page(self, page, partial=False):
+        """Make a loaded page current and show its first screen
+        
+        partial is for the first screens of a page still loading.
+        """
+        self.remember_place()
+        shown = self.condense(page, partial)
+        if shown['title']:
+            self.send_line(f"\r\n=== {shown['title']} ===\r\n")
+        
+        self.set_current_page(shown, partial)
+        self.page = 0
+        self.viewing_links = False
+        
+        # Show first page of content
+        self.show_content_page()
+        self.prefetch([link['url'] for link in self.current_links])
+        
+        self.send_line('U. New URL  M. Menu')
+        self.send('> ')
+        self.current_menu = "page"
+        self.awaiting_url = False
+        self.search.add(page)
+    
+    def condense(self, page, partial=False):
+        """page as it goes to the device, condensed if a Condenser is set
+        
+        A partial page is condensed without being learned from or logged;
+        that happens once, for the whole page, in finish_loading().
+        """
+        if not self.condenser:
+            return page
+        with metrics.span('condense'):
+            page, report = self.condenser.condense(page, learn=not partial)
+        if report.saved and not partial:
+            metrics.count('condense.bytes_saved', report.saved)
+            print(f"{self.log_prefix}{report}")
+        return page
+    
+    def set_current_page(self, page, partial=False):
+        """Make a distilled page the one being read (partial: its first screens)"""
+        self.current_url = page['url']
+        self.current_title = page['title']
+        self.current_content = page['content']
+        self.current_links = page['links']
+        self.current_partial = partial
+    
+    def remember_place(self):
+        """Push the page or listing being left onto the history"""
+        if self.current_menu == "page" and self.current_url:
+            self.history.push_page({
+                'url': self.current_url,
+                'title': self.current_title,
+                'content': self.current_content,
+                'links': self.current_links,
+            }, self.page, self.viewing_links, self.current_partial)
+        elif self.current_menu in ("hn", "reddit", "search"):
+            self.history.push_listing(self.current_menu, self.page)
+    
+    def go_back(self):
+        """Return to the previous page or listing, on the same screen"""
+        with metrics.span('history.back'):
+            entry = self.history.pop()
+            if entry is None:
+                self.send_line('\r\nNothing to go back to')
+                self.send_line('U. New URL  M. Menu')
                 self.send('> ')
                 return
-            
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            for script in soup(["script", "style", "nav", "footer", "header", "iframe"]):
-                script.decompose()
-            
-            title = soup.find('title')
-            if title:
-                title_text = title.get_text().strip()[:40]
-                self.send_line(f'\r\n=== {title_text} ===\r\n')
-            
-            main_content = (
-                soup.find('article') or 
-                soup.find('main') or 
-                soup.find('div', class_=re.compile('content|article|post|entry', re.I)) or
-                soup.find('body')
-            )
-            
-            # Extract and store content paragraphs
-            self.current_content = []
-            if main_content:
-                paragraphs = main_content.find_all('p')
-                
-                if paragraphs:
-                    for p in paragraphs:
-                        text = p.get_text().strip()
-                        if len(text) > 20:
-                            self.current_content.append(text)
-                else:
-                    # Fallback to body text, split into chunks
-                    text = main_content.get_text()
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    # Split into ~200 char chunks
-                    words = text.split()
-                    chunk = []
-                    current_length = 0
-                    for word in words:
-                        if current_length + len(word) + 1 > 200 and chunk:
-                            self.current_content.append(' '.join(chunk))
-                            chunk = [word]
-                            current_length = len(word)
-                        else:
-                            chunk.append(word)
-                            current_length += len(word) + 1
-                    if chunk:
-                        self.current_content.append(' '.join(chunk))
-            
-            # Extract links for later
-            self.current_links = self.extract_links(soup, url)
-            self.page = 0
-            self.viewing_links = False
-            
-            # Show first page of content
-            self.show_content_page()
-            
-            self.send_line('U. New URL  M. Menu')
+            menu, page, screen, viewing_links, partial = entry
+            if partial:
+                self.reload_place(page, screen, viewing_links)
+            else:
+                self.return_to(menu, page, screen, viewing_links)
+    
+    def return_to(self, menu, page, screen, viewing_links, partial=False):
+        """Make a page or listing from the history current and redraw it"""
+        if page is not None:
+            if page['title']:
+                self.send_line(f"\r\n=== {page['title']} ===\r\n")
+            self.set_current_page(page, partial)
+        self.current_menu = menu
+        self.page = screen
+        self.viewing_links = viewing_links
+        self.awaiting_url = False
+        self.awaiting_search = False
+        # Redraw that screen without moving
+        self.handle_pagination(None)
+    
+    def reload_place(self, page, screen, viewing_links):
+        """Go back to a page that was left before it had all loaded
+        
+        Its download went on into the HTTP cache, so the whole page is
+        usually there; if it can't be had, the screens that were shown are.
+        """
+        try:
+            whole = self.load_page(page['url'])
+        except Exception as e:
+            self.reload_failed(page, screen, viewing_links, e)
+            return
+        self.reloaded(screen, viewing_links, whole)
+    
+    def reloaded(self, screen, viewing_links, page):
+        self.search.add(page)
+        self.return_to('page', self.condense(page), screen, viewing_links)
+    
+    def reload_failed(self, page, screen, viewing_links, e):
+        print(f"{self.log_prefix}Reloading {page['url']} failed: {e}")
+        self.return_to('page', page, screen, viewing_links, partial=True)
+    
+    def show_fetch_error(self, e):
+        """Report a failed page fetch"""
+        # Here rather than at the top, to keep it off the startup path
+        import requests
+        if isinstance(e, FetchError):
+            self.send_line(f'\r\n{e}')
+            self.send_line('M. Main Menu')
             self.send('> ')
-            self.current_menu = "page"
-            self.awaiting_url = False
-            
-        except requests.exceptions.Timeout:
+        elif isinstance(e, requests.exceptions.Timeout):
             self.send_line('\r\nTimeout - site too slow')
             self.send_line('Try again or M for menu')
             self.send('URL> ')
-        except requests.exceptions.ConnectionError:
+        elif isinstance(e, requests.exceptions.ConnectionError):
             self.send_line('\r\nConnection failed')
             self.send_line('Check URL or M for menu')
             self.send('URL> ')
-        except Exception as e:
+        else:
             self.send_line(f'\r\nError: {str(e)[:40]}')
             self.send_line('M. Main Menu')
             self.send('> ')
@@ -285,15 +570,27 @@ class GameComGateway:
         """Handle AT commands from Game.com"""
         cmd = cmd.lower().strip()
         if cmd == 'atz':
+            self.requested_rate = None
             self.send_line('OK')
         elif cmd.startswith('atdt'):
-            self.send_line('CONNECT 9600')
-            self.connected = True
-            time.sleep(0.5)
+            self.answer_dial()
+            self.flush()
+            # Give the device time to switch to data mode (no time at all
+            # with flow control: it holds us off until it's ready)
+            time.sleep(self.out.settle_time())
             self.show_main_menu()
         else:
+            rate = requested_rate(cmd)
+            if rate:
+                self.requested_rate = rate
             self.send_line('OK')
     
+    def answer_dial(self):
+        """Bring the link up at the negotiated rate and report it"""
+        rate = self.out.set_link_rate(self.requested_rate)
+        self.send_line(f'CONNECT {rate}')
+        self.connected = True
+    
     def show_main_menu(self):
         """Show main menu"""
         self.send_line('\r\n=== GAME.COM GATEWAY ===')
@@ -303,84 +600,96 @@ class GameComGateway:
         self.send_line('2. Reddit r/technology')
         self.send_line('3. Enter URL')
         self.send_line('4. Help')
+        self.send_line('5. Search')
         self.send_line('')
         self.send('> ')
         self.current_menu = "main"
         self.awaiting_url = False
+        self.awaiting_search = False
         self.page = 0
+        if self.prefetcher:
+            self.prefetcher.cancel(self.session)
     
     def fetch_hackernews(self):
-        """Fetch Hacker News headlines"""
+        """Show Hacker News headlines"""
+        self.fetch_feed('hn', self.show_hackernews)
+    
+    def fetch_feed(self, name, show):
+        """Show a feed from its latest snapshot, loading it first if need be"""
+        snapshot = self.feeds.latest(name)
+        if snapshot is not None:
+            show(*snapshot.listing)
+            return
+        self.send_line(f'\r\nFetching {self.feeds.feeds[name].label}...')
+        self.flush()
         try:
-            self.send_line('\r\nFetching HN...')
-            resp = requests.get('https://news.ycombinator.com', timeout=10)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            stories = []
-            story_links = []
-            
-            for item in soup.select('.titleline')[:15]:
-                link = item.find('a')
-                if link:
-                    title = link.get_text()
-                    href = link.get('href', '')
-                    stories.append(title)
-                    story_links.append(href)
-            
-            self.hn_stories = stories
-            self.hn_links = story_links
-            self.page = 0
-            
-            self.send_line('\r\n=== HACKER NEWS ===')
-            self.show_paginated_items(stories, "stories")
-            
-            self.send_line('Enter # to read')
-            self.send_line('M. Main Menu')
-            self.send('> ')
-            self.current_menu = "hn"
-            
+            titles, links = self.load_feed(name)
         except Exception as e:
-            self.send_line(f'\r\nError: {str(e)[:40]}')
-            self.send_line('M. Main Menu')
-            self.send('> ')
+            metrics.count('fetch.errors')
+            self.show_feed_error(e)
+            return
+        show(titles, links)
     
-    def fetch_reddit(self):
-        """Fetch Reddit r/technology"""
+    def load_feed(self, name):
+        """(titles, links) of a feed; blocks if it has to be loaded
+        
+        Falls back to the site pack's copy if the feed can't be loaded.
+        """
         try:
-            self.send_line('\r\nFetching Reddit...')
-            resp = requests.get(
-                'https://old.reddit.com/r/technology', 
-                headers={'User-Agent': 'GameCom/1.0'}, 
-                timeout=10
-            )
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            self.reddit_titles = []
-            self.reddit_posts = []
-            
-            for post in soup.select('.thing')[:15]:
-                title_elem = post.select_one('.title')
-                if title_elem:
-                    title = title_elem.get_text().strip()
-                    link = title_elem.find('a')
-                    url = link.get('href', '') if link else ''
-                    self.reddit_titles.append(title)
-                    self.reddit_posts.append(url)
-            
-            self.page = 0
-            
-            self.send_line('\r\n=== r/technology ===')
-            self.show_paginated_items(self.reddit_titles, "posts")
-            
-            self.send_line('Enter # to read')
-            self.send_line('M. Main Menu')
-            self.send('> ')
-            self.current_menu = "reddit"
-            
-        except Exception as e:
-            self.send_line(f'\r\nError: {str(e)[:40]}')
-            self.send_line('M. Main Menu')
-            self.send('> ')
+            return self.feeds.get(name).listing
+        except Exception:
+            listing = self.pack.feed(name) if self.pack else None
+            if listing is None:
+                raise
+            return listing
+    
+    @metrics.timed('show.listing')
+    def show_hackernews(self, stories, story_links):
+        """Make HN listing current and show its first page"""
+        self.hn_stories = stories
+        self.hn_links = story_links
+        self.page = 0
+        
+        self.send_line('\r\n=== HACKER NEWS ===')
+        self.show_paginated_items(stories, "stories")
+        
+        self.send_line('Enter # to read')
+        self.send_line('M. Main Menu')
+        self.send('> ')
+        self.current_menu = "hn"
+        self.prefetch([self.hn_url(href) for href in story_links])
+    
+    def hn_url(self, href):
+        """Absolute URL for a link on the HN front page"""
+        if not href.startswith('http'):
+            href = self.hn_base + href
+        return href
+    
+    def fetch_reddit(self):
+        """Show Reddit r/technology"""
+        self.fetch_feed('reddit', self.show_reddit)
+    
+    @metrics.timed('show.listing')
+    def show_reddit(self, titles, posts):
+        """Make Reddit listing current and show its first page"""
+        self.reddit_titles = titles
+        self.reddit_posts = posts
+        self.page = 0
+        
+        self.send_line('\r\n=== r/technology ===')
+        self.show_paginated_items(self.reddit_titles, "posts")
+        
+        self.send_line('Enter # to read')
+        self.send_line('M. Main Menu')
+        self.send('> ')
+        self.current_menu = "reddit"
+        self.prefetch([url for url in posts if url.startswith('http')])
+    
+    def show_feed_error(self, e):
+        """Report a failed feed fetch"""
+        self.send_line(f'\r\nError: {str(e)[:40]}')
+        self.send_line('M. Main Menu')
+        self.send('> ')
     
     def prompt_for_url(self):
         """Prompt user to enter URL"""
@@ -394,8 +703,41 @@ class GameComGateway:
         self.send('URL> ')
         self.awaiting_url = True
     
+    def prompt_for_search(self):
+        """Prompt for words to look for in pages read so far"""
+        self.send_line('\r\n=== SEARCH ===')
+        self.send_line('Find pages you have read')
+        self.send_line('')
+        self.send_line('Or M for main menu')
+        self.send('Find> ')
+        self.awaiting_url = False
+        self.awaiting_search = True
+    
+    def run_search(self, text):
+        """Search the index and show the results"""
+        with metrics.span('search'):
+            results = self.search.search(text)
+        if not results:
+            self.send_line('\r\nNo pages found')
+            self.send_line('Try other words or M for menu')
+            self.send('Find> ')
+            return
+        self.awaiting_search = False
+        self.search_results = results
+        self.page = 0
+        self.show_search_results()
+        self.current_menu = "search"
+    
+    def show_search_results(self):
+        """Show the current page of search results"""
+        self.send_line(f'\r\n=== FOUND {len(self.search_results)} ===')
+        self.show_paginated_items(self.search_results, "results")
+        self.send_line('Enter # to read')
+        self.send_line('S. Search  M. Menu')
+        self.send('> ')
+    
     def handle_pagination(self, direction):
-        """Handle N/P pagination commands"""
+        """Handle N/P pagination commands (None redraws the current screen)"""
         if direction == 'N':
             self.page += 1
         elif direction == 'P':
@@ -413,6 +755,8 @@ class GameComGateway:
             self.send_line('Enter # to read')
             self.send_line('M. Main Menu')
             self.send('> ')
+        elif self.current_menu == "search":
+            self.show_search_results()
         elif self.current_menu == "page":
             if self.viewing_links:
                 # Paginating through links
@@ -420,7 +764,7 @@ class GameComGateway:
             else:
                 # Paginating through content
                 # Check if we're at the end and should switch to links
-                if direction == 'N' and self.page >= len(self.current_content) - 1:
+                if direction == 'N' and self.page >= len(self.content_frames()):
                     # Transition to links
                     self.viewing_links = True
                     self.page = 0
@@ -431,6 +775,8 @@ class GameComGateway:
     def handle_user_input(self, line):
         """Handle user input based on current menu"""
         line = line.strip()
+        if not self.settle_loading(line):
+            return
         
         if self.awaiting_url:
             if line.upper() == 'M':
@@ -439,6 +785,13 @@ class GameComGateway:
                 self.fetch_url(line)
             return
         
+        if self.awaiting_search:
+            if line.upper() == 'M':
+                self.show_main_menu()
+            else:
+                self.run_search(line)
+            return
+        
         line_upper = line.upper()
         
         if line_upper == 'M':
@@ -449,6 +802,14 @@ class GameComGateway:
             self.prompt_for_url()
             return
         
+        if line_upper == 'S':
+            self.prompt_for_search()
+            return
+        
+        if line_upper == 'B' and not (self.current_menu == "page" and self.viewing_links):
+            self.go_back()
+            return
+        
         if line_upper in ['N', 'P']:
             self.handle_pagination(line_upper)
             return
@@ -460,11 +821,15 @@ class GameComGateway:
                 self.fetch_reddit()
             elif line == '3':
                 self.prompt_for_url()
+            elif line == '5':
+                self.prompt_for_search()
             elif line == '4':
                 self.send_line('\r\n=== HELP ===')
                 self.send_line('Type menu numbers')
                 self.send_line('M = main menu')
                 self.send_line('U = enter new URL')
+                self.send_line('S = search read pages')
+                self.send_line('B = back')
                 self.send_line('# = follow link')
                 self.send_line('N/P = next/prev page')
                 self.send_line('')
@@ -477,10 +842,7 @@ class GameComGateway:
             try:
                 num = int(line)
                 if 1 <= num <= len(self.hn_links):
-                    url = self.hn_links[num - 1]
-                    if not url.startswith('http'):
-                        url = 'https://news.ycombinator.com/' + url
-                    self.fetch_url(url)
+                    self.fetch_url(self.hn_url(self.hn_links[num - 1]))
                 else:
                     self.send_line('\r\nInvalid number')
                     self.send('> ')
@@ -501,16 +863,24 @@ class GameComGateway:
                 self.send_line('\r\nEnter number, N/P, or M')
                 self.send('> ')
         
-        elif self.current_menu == "page":
-            if line_upper == 'B':
-                # Back to content from links
-                if self.viewing_links:
-                    self.viewing_links = False
-                    self.page = 0
-                    self.show_content_page()
+        elif self.current_menu == "search":
+            try:
+                num = int(line)
+                if 1 <= num <= len(self.search_results):
+                    self.fetch_url(self.search_results[num - 1]['url'])
                 else:
-                    self.send_line('\r\nAlready viewing content')
+                    self.send_line('\r\nInvalid number')
                     self.send('> ')
+            except ValueError:
+                self.send_line('\r\nEnter number, N/P, S, or M')
+                self.send('> ')
+        
+        elif self.current_menu == "page":
+            if line_upper == 'B':
+                # Back to content from links (B on content goes back a page)
+                self.viewing_links = False
+                self.page = 0
+                self.show_content_page()
                 return
             
             try:
@@ -530,47 +900,330 @@ class GameComGateway:
                 self.send_line('\r\nEnter #, N/P, B, U, or M')
                 self.send('> ')
     
+    def handle_data(self, data):
+        """Process raw bytes read from the serial port"""
+        data = self.out.filter_input(data)
+        if not self.connected:
+            self.buffer += data.decode('ascii', errors='ignore')
+            if '\r' in self.buffer:
+                lines = self.buffer.split('\r')
+                for line in lines[:-1]:
+                    self.submit('at', line)
+                self.buffer = lines[-1]
+        else:
+            text = data.decode('ascii', errors='ignore')
+            for char in text:
+                self.handle_key(char)
+    
+    def handle_key(self, char):
+        """Line editing: echo, backspace, and submit on Enter"""
+        if char == '\r':
+            line = self.user_buffer
+            self.user_buffer = ""
+            self.echo('\r\n')
+            self.submit('user', line)
+        elif char == '\x08' or char == '\x7f':
+            if self.user_buffer:
+                self.user_buffer = self.user_buffer[:-1]
+                self.echo('\x08 \x08')
+        elif char >= ' ' or char == '\t':
+            self.user_buffer += char
+            self.echo(char)
+    
+    def submit(self, kind, line):
+        """Hand a completed AT or user line to the command loop"""
+        if self.commands is not None:
+            self.commands.put((kind, line))
+        else:
+            self.dispatch(kind, line)
+    
+    def dispatch(self, kind, line):
+        """Run one AT command or user command and send its output"""
+        try:
+            if kind == 'at':
+                print(f"{self.log_prefix}<< AT: {line}")
+                self.handle_at_command(line)
+            elif kind == 'resume':
+                self.resume()
+            else:
+                print(f"{self.log_prefix}User: {line}")
+                # Whole command, fetch included; profiled when profiling is on
+                with metrics.span('input.command'):
+                    metrics.profiler.call(self.handle_user_input, line)
+            self.flush()
+        except (serial.SerialException, OSError) as e:
+            # Port gone mid-reply; the reader thread reopens it and resumes
+            print(f"{self.log_prefix}Output lost: {e}")
+    
+    def read_loop(self):
+        """Reader thread: wake on input, echo it and assemble lines
+        
+        Runs apart from the command loop, so typing is echoed within
+        milliseconds even while a page is fetched or sent. If the port
+        goes away it is reopened, and the session resumed.
+        """
+        while True:
+            try:
+                # Returns as soon as a byte arrives (or on the port timeout)
+                data = self.ser.read(1)
+                if not data:
+                    continue
+                waiting = self.ser.in_waiting
+                if waiting:
+                    data += self.ser.read(waiting)
+                self.handle_data(data)
+            except (serial.SerialException, OSError) as e:
+                self.reconnect(e)
+    
+    def locate_port(self):
+        """Device to open: the adapter with a matching USB ID, else port"""
+        if self.usb_ids:
+            found = find_port(self.usb_ids)
+            if found:
+                return found
+        return self.port or '/dev/ttyUSB0'
+    
+    def open_port(self):
+        """Open the serial port (raises SerialException if it isn't there)"""
+        device = self.locate_port()
+        # XON/XOFF is handled by FrameWriter, not the OS, so stalls are seen
+        ser = serial.Serial(device, self.baudrate, timeout=0.1,
+                            rtscts=(self.out.flow == 'rtscts'))
+        try:
+            ser.dtr = True
+            ser.rts = True
+        except OSError:
+            # PTYs have no modem control lines
+            pass
+        self.ser = self.out.ser = ser
+        print(f"{self.log_prefix}Opened {device}")
+    
+    def close_port(self):
+        if self.ser is None:
+            return
+        try:
+            self.ser.close()
+        except (serial.SerialException, OSError):
+            pass
+    
+    def wait_for_port(self):
+        """Open the port, retrying until the adapter shows up"""
+        waiting = False
+        while True:
+            try:
+                self.open_port()
+                return
+            except (serial.SerialException, OSError) as e:
+                if not waiting:
+                    print(f"{self.log_prefix}Waiting for serial port ({e})")
+                    waiting = True
+                time.sleep(self.reconnect_interval)
+    
+    def reconnect(self, error):
+        """Reopen a port that went away (adapter unplugged), keeping the session"""
+        print(f"{self.log_prefix}Serial port lost: {error}")
+        metrics.count('serial.disconnects')
+        self.close_port()
+        self.wait_for_port()
+        if self.connected:
+            self.submit('resume', '')
+    
+    def resume(self):
+        """Put the screen the user was on back up after a reconnect"""
+        print(f"{self.log_prefix}Resuming session")
+        if self.awaiting_url:
+            self.prompt_for_url()
+        elif self.awaiting_search:
+            self.prompt_for_search()
+        elif self.current_menu == "main":
+            self.show_main_menu()
+        else:
+            self.handle_pagination(None)
+        # Whatever was typed before the drop is still in the buffer
+        self.send(self.user_buffer)
+    
     def run(self):
         """Main loop"""
         print("Game.com Web Gateway running...")
-        print("Waiting for connection...\n")
-        
-        user_buffer = ""
         
+        self.commands = queue.Queue()
         try:
+            if self.ser is None:
+                self.wait_for_port()
+            threading.Thread(target=self.read_loop, daemon=True,
+                             name='serial-reader').start()
+            self.report_ready()
+            # Listings (and requests with them) load behind the first ATZ
+            self.feeds.start()
             while True:
-                data = self.ser.read(100)
-                if data:
-                    if not self.connected:
-                        self.buffer += data.decode('ascii', errors='ignore')
-                        if '\r' in self.buffer:
-                            lines = self.buffer.split('\r')
-                            for line in lines[:-1]:
-                                print(f"<< AT: {line}")
-                                self.handle_at_command(line)
-                            self.buffer = lines[-1]
-                    else:
-                        text = data.decode('ascii', errors='ignore')
-                        for char in text:
-                            if char == '\r':
-                                print(f"User: {user_buffer}")
-                                self.send('\r\n')
-                                self.handle_user_input(user_buffer)
-                                user_buffer = ""
-                            elif char == '\x08' or char == '\x7f':
-                                if user_buffer:
-                                    user_buffer = user_buffer[:-1]
-                                    self.send('\x08 \x08')
-                            elif char >= ' ' or char == '\t':
-                                user_buffer += char
-                                self.send(char)
-                
-                time.sleep(0.01)
+                kind, line = self.commands.get()
+                self.dispatch(kind, line)
                 
         except KeyboardInterrupt:
             print("\nShutting down...")
-            self.ser.close()
+            self.close_port()
+            self.print_stats()
+    
+    def report_ready(self):
+        """Log the cold start: first import to answering ATZ"""
+        elapsed = time.time() - metrics.registry.started
+        metrics.observe('startup', elapsed)
+        print(f"Ready in {elapsed * 1000:.0f} ms")
+        print("Waiting for connection...\n")
+    
+    def print_stats(self):
+        """Dump link and cache counters to the console"""
+        print(self.out.summary())
+        if isinstance(self.http, HttpCache):
+            print(self.http.summary())
+            if hasattr(self.http.http, 'summary'):
+                print(self.http.http.summary())
+        print(self.pages.summary())
+        print(self.feeds.summary())
+        print(self.search.summary())
+        if self.condenser:
+            print(self.condenser.summary())
+        if self.pack:
+            print(self.pack.summary())
+        if self.prefetcher:
+            print(self.prefetcher.summary())
+            self.prefetcher.shutdown()
+        if self.parse_pool:
+            print(self.parse_pool.summary())
+            self.parse_pool.close()
+        print(metrics.registry.report())
+
+for _name in Session.__slots__:
+    setattr(GameComGateway, _name, session_property(_name))
+del _name
+
 
 if __name__ == "__main__":
-    gateway = GameComGateway()
-    gateway.run()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Tiger Game.com serial-to-HTTP gateway')
+    parser.add_argument('--port', action='append',
+                        help='serial device (repeat to serve several units; '
+                             'default: the first known USB serial adapter '
+                             'plugged in, else /dev/ttyUSB0)')
+    parser.add_argument('--usb', action='append', type=parse_usb_id,
+                        metavar='VID:PID',
+                        help='find the port by USB vendor/product ID, in hex '
+                             '(repeatable; see python ports.py)')
+    parser.add_argument('--baud', type=int, default=9600, help='serial baud rate')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='run on an asyncio loop (typing works during fetches, M cancels)')
+    parser.add_argument('--cache-dir',
+                        help='keep an on-disk copy of the HTTP cache here')
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N',
+                        help='prefetch the first N links of each listing/page')
+    parser.add_argument('--parser', default='auto',
+                        choices=['auto', 'lxml', 'html.parser', 'bs4'],
+                        help='HTML parser for page extraction')
+    parser.add_argument('--rows', type=int, default=12,
+                        help='lines of article text per screen')
+    parser.add_argument('--parse-workers', type=int, default=0, metavar='N',
+                        help='parse big pages in N worker processes')
+    parser.add_argument('--stream', action='store_true',
+                        help='parse pages while downloading and stop early')
+    parser.add_argument('--max-kb', type=int, default=256,
+                        help='with --stream, stop reading a page after this many KB')
+    parser.add_argument('--max-seconds', type=float, default=8.0,
+                        help='with --stream, stop reading a page after this long')
+    parser.add_argument('--progressive', action='store_true',
+                        help="show a page's first screen while the rest downloads")
+    parser.add_argument('--no-condense', dest='condense', action='store_false',
+                        help='send pages as extracted (keep boilerplate, repeated '
+                             'paragraphs and spacing)')
+    parser.add_argument('--page-kb', type=float, default=0, metavar='KB',
+                        help="cut each article's text to this many KB "
+                             '(default: no limit)')
+    parser.add_argument('--flow', default='none', choices=['none', 'rtscts', 'xonxoff'],
+                        help='serial flow control (lets output run at the '
+                             'fastest rate the device keeps up with)')
+    parser.add_argument('--pack', metavar='FILE',
+                        help='serve pages from a site pack (see sitepack.py) '
+                             'before going online')
+    parser.add_argument('--search-db', metavar='FILE',
+                        help='keep the search index of read pages in this file '
+                             '(default: in memory)')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve stage timings on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--stats-interval', type=float, default=0, metavar='SECONDS',
+                        help='print the stage timing table this often')
+    parser.add_argument('--profile', action='store_true',
+                        help='cProfile user commands; top functions printed on exit')
+    args = parser.parse_args()
+    ports = args.port or [None]
+    # One unit can be found by USB ID, wherever it was plugged in
+    usb_ids = args.usb or (None if args.port else KNOWN_ADAPTERS)
+    pack = None
+    if args.pack:
+        from sitepack import SitePack
+        pack = SitePack(args.pack)
+    parse_pool = None
+    if args.parse_workers:
+        # Started up front so the first big page doesn't wait for workers
+        from parsepool import ParsePool
+        parse_pool = ParsePool(workers=args.parse_workers)
+    # Per-session settings, passed to every gateway
+    options = {
+        'stream': args.stream,
+        'stream_max_bytes': args.max_kb * 1024,
+        'stream_max_seconds': args.max_seconds,
+        'progressive': args.progressive,
+        'parser': args.parser,
+        'parse_pool': parse_pool,
+        'rows': args.rows,
+        'flow': args.flow,
+        'pack': pack,
+        'search': SearchIndex(args.search_db),
+        # One Condenser, so every unit learns each site's boilerplate
+        'condenser': Condenser(max_bytes=int(args.page_kb * 1024) or None)
+                     if args.condense else None,
+    }
+    
+    if len(ports) > 1:
+        from multiport import MultiPortGateway
+        gateway = MultiPortGateway(ports, baudrate=args.baud,
+                                   cache_dir=args.cache_dir,
+                                   prefetch=args.prefetch, **options)
+    elif args.use_async:
+        from async_gateway import AsyncGameComGateway
+        gateway = AsyncGameComGateway(port=ports[0], baudrate=args.baud,
+                                      http=HttpCache(disk_dir=args.cache_dir),
+                                      usb_ids=usb_ids, **options)
+    else:
+        gateway = GameComGateway(port=ports[0], baudrate=args.baud,
+                                 http=HttpCache(disk_dir=args.cache_dir),
+                                 usb_ids=usb_ids, **options)
+    if args.prefetch and len(ports) == 1:
+        from prefetch import Prefetcher
+        gateway.prefetcher = Prefetcher(gateway.prefetch_page, top_n=args.prefetch)
+    
+    def summaries():
+        lines = [gateway.http.summary()]
+        if gateway.http.http is not None:
+            lines.append(gateway.http.http.summary())
+        lines += [gateway.pages.summary(),
+                  gateway.feeds.summary(), options['search'].summary()]
+        if options['condenser']:
+            lines.append(options['condenser'].summary())
+        if gateway.prefetcher:
+            lines.append(gateway.prefetcher.summary())
+        if parse_pool:
+            lines.append(parse_pool.summary())
+        if pack:
+            lines.append(pack.summary())
+        return lines
+    
+    if args.metrics_port:
+        metrics.MetricsServer(args.metrics_port, extra=summaries).start()
+        print(f"Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.stats_interval:
+        metrics.dump_every(args.stats_interval, extra=summaries)
+    if args.profile:
+        metrics.profiler.start()
+    gateway.run()
+    if args.profile:
+        print(metrics.profiler.stop())
\ No newline at end of file
@@ -0,0 +1,250 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+from urllib.parse import urlsplit
+
+
+# Furniture any site might put in a <p>: cookie notices, newsletter and
+# share prompts. Only short paragraphs are checked, so an article that
+# mentions cookies keeps its text.
+BOILERPLATE = re.compile(
+    r'\b(?:we use cookies|cookie (?:policy|settings|preferences)|'
+    r'accept (?:all )?cookies|(?:sign up|subscribe) (?:for|to) (?:our|the) '
+    r'(?:\w+ )?newsletter|share (?:this|on) (?:article|story|page|facebook|'
+    r'twitter)|follow us on|all rights reserved|related (?:articles|stories):)',
+    re.I)
+BOILERPLATE_MAX = 160
+
+# Fingerprints ignore case, digits, punctuation and spacing, so a byline
+# "Updated 3 hours ago" matches the one that said "5 hours ago"
+NOT_LETTERS = re.compile(r'[^a-z]+')
+
+SPACES = re.compile(r'\s+')
+SPACE_BEFORE = re.compile(r' +(?=[,.;:!?)\]])')
+SPACE_AFTER = re.compile(r'(?<=[(\[]) +')
+# Three or more of the same punctuation mark
+RUNS = re.compile(r'([!?.,;:*=_~#-])\1{2,}')
+SQUEEZED = {'.': '...', '-': '--'}
+
+# Last paragraph of an article cut to max_bytes
+CUT_NOTE = '(Rest of article not sent)'
+
+
+def fingerprint(text):
+    """Key two paragraphs share if they say the same thing
+
+    None for a paragraph with no letters (scores, prices, dates, or text
+    that came through as '?'): there is nothing to tell those apart by.
+    """
+    letters = NOT_LETTERS.sub(' ', text.lower()).strip()
+    return hash(letters) if letters else None
+
+
+def tidy(text):
+    """text with whitespace collapsed and runs of punctuation squeezed"""
+    text = SPACES.sub(' ', text).strip()
+    text = SPACE_BEFORE.sub('', text)
+    text = SPACE_AFTER.sub('', text)
+    return RUNS.sub(lambda m: SQUEEZED.get(m.group(1), m.group(1)), text)
+
+
+def text_bytes(page):
+    """Bytes of a page's title and paragraphs (what condensing works on)"""
+    return len(page['title']) + sum(len(text) for text in page['content'])
+
+
+class CondenseReport:
+    """What condensing one page saved"""
+
+    def __init__(self, url, before, after, boilerplate, repeats, cut):
+        self.url = url
+        self.before = before
+        self.after = after
+        self.boilerplate = boilerplate
+        self.repeats = repeats
+        self.cut = cut
+
+    @property
+    def saved(self):
+        return self.before - self.after
+
+    def __str__(self):
+        percent = 100.0 * self.saved / self.before if self.before else 0.0
+        return (f"Condensed {self.url}: {self.before} -> {self.after} bytes "
+                f"({percent:.0f}% saved; {self.boilerplate} boilerplate, "
+                f"{self.repeats} repeated, {self.cut} bytes over budget)")
+
+
+class Condenser:
+    """Trims distilled pages before they go down the wire
+
+    Every paragraph is tidied (whitespace collapsed, no space before
+    punctuation, '!!!' and '.....' squeezed). A paragraph repeated within
+    a page is sent once. Paragraphs seen on min_pages different pages of
+    the same host are that site's furniture (bylines, cookie notices,
+    share and newsletter prompts) and are dropped, as are short ones that
+    look like that on any site. With max_bytes, the article is cut to
+    that many bytes of text.
+
+    Pages are told apart by host and path: the same article over http and
+    https or with tracking parameters is one page, and so is a page most
+    of whose text is already on one other page of the host (it came
+    under a second address, say through a redirect).
+
+    What each host repeats is learned from the pages shown and prefetched,
+    in memory (at most max_fingerprints paragraphs for each of max_hosts
+    hosts). Thread-safe, so sessions can share one.
+    """
+
+    def __init__(self, min_pages=3, max_bytes=None, max_hosts=64,
+                 max_fingerprints=4096):
+        self.min_pages = min_pages
+        self.max_bytes = max_bytes
+        self.max_hosts = max_hosts
+        self.max_fingerprints = max_fingerprints
+        # host -> OrderedDict of fingerprint -> URLs it was seen on
+        self.hosts = OrderedDict()
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.boilerplate = 0
+        self.repeats = 0
+
+    def learn(self, page):
+        """Note which paragraphs page's host has shown on it"""
+        self.record(page['url'], [fingerprint(text) for text in page['content']],
+                    [len(text) for text in page['content']])
+
+    def record(self, url, keys, sizes):
+        """Note keys (of paragraphs sizes long) as seen on url
+
+        Returns how many pages each key is on.
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        # Scheme, query and fragment don't make it a different page
+        url = parts.path or '/'
+        with self.lock:
+            seen = self.hosts.get(host)
+            if seen is None:
+                seen = self.hosts[host] = OrderedDict()
+                while len(self.hosts) > self.max_hosts:
+                    self.hosts.popitem(last=False)
+            self.hosts.move_to_end(host)
+            url = self.same_page(seen, url, keys, sizes)
+            counts = []
+            for key in keys:
+                if key is None:
+                    counts.append(0)
+                    continue
+                urls = seen.get(key)
+                if urls is None:
+                    urls = seen[key] = []
+                seen.move_to_end(key)
+                # Only up to min_pages URLs are needed to decide
+                if url not in urls and len(urls) < self.min_pages:
+                    urls.append(url)
+                counts.append(len(urls))
+            while len(seen) > self.max_fingerprints:
+                seen.popitem(last=False)
+        return counts
+
+    @staticmethod
+    def same_page(seen, url, keys, sizes):
+        """url, or the page already in seen with most of the same text"""
+        shared = Counter()
+        for key, size in zip(keys, sizes):
+            for other in seen.get(key, ()):
+                if other != url:
+                    shared[other] += size
+        if shared:
+            other, size = shared.most_common(1)[0]
+            if size * 2 > sum(sizes):
+                return other
+        return url
+
+    def seen_on(self, url, keys):
+        """How many pages of url's host each key is on, noting nothing"""
+        host = (urlsplit(url).hostname or '').lower()
+        with self.lock:
+            seen = self.hosts.get(host, {})
+            return [len(seen.get(key, ())) for key in keys]
+
+    def condense(self, page, learn=True):
+        """(condensed copy of page, CondenseReport)
+
+        With learn=False (the first screens of a page still loading) the
+        page is condensed on what is known already, and neither recorded
+        nor counted in the totals.
+        """
+        keys = [fingerprint(text) for text in page['content']]
+        if learn:
+            counts = self.record(page['url'], keys,
+                                 [len(text) for text in page['content']])
+        else:
+            counts = self.seen_on(page['url'], keys)
+        content = []
+        shown = set()
+        boilerplate = repeats = 0
+        for text, count in zip(page['content'], counts):
+            # Repeats within a page have to match exactly: fingerprints
+            # ignore digits, and "Price: $5" is not "Price: $10"
+            text = tidy(text)
+            if text in shown:
+                repeats += 1
+                continue
+            shown.add(text)
+            if count >= self.min_pages or (len(text) <= BOILERPLATE_MAX and
+                                           BOILERPLATE.search(text)):
+                boilerplate += 1
+            else:
+                content.append(text)
+        if not content and page['content']:
+            # Nothing but furniture: better that than a blank page
+            content = [tidy(text) for text in page['content']]
+        content, cut = self.fit(content)
+        condensed = {
+            'url': page['url'],
+            'title': tidy(page['title']),
+            'content': content,
+            'links': page['links'],
+        }
+        report = CondenseReport(page['url'], text_bytes(page), text_bytes(condensed),
+                                boilerplate, repeats, cut)
+        if not learn:
+            return condensed, report
+        with self.lock:
+            self.pages += 1
+            self.bytes_in += report.before
+            self.bytes_out += report.after
+            self.boilerplate += boilerplate
+            self.repeats += repeats
+        return condensed, report
+
+    def fit(self, content):
+        """content cut to max_bytes of text; returns (content, bytes cut)"""
+        total = sum(len(text) for text in content)
+        if not self.max_bytes or total <= self.max_bytes:
+            return content, 0
+        kept = []
+        room = self.max_bytes - len(CUT_NOTE)
+        for text in content:
+            if len(text) <= room:
+                kept.append(text)
+                room -= len(text)
+                continue
+            if room >= 40:
+                # Worth ending on part of a paragraph, at a word break
+                kept.append(text[:room - 4].rsplit(' ', 1)[0] + ' ...')
+            break
+        kept.append(CUT_NOTE)
+        return kept, total - sum(len(text) for text in kept)
+
+    def summary(self):
+        saved = self.bytes_in - self.bytes_out
+        percent = 100.0 * saved / self.bytes_in if self.bytes_in else 0.0
+        return (f"Condenser: {self.pages} pages, {saved} of {self.bytes_in} bytes "
+                f"saved ({percent:.0f}%), {self.boilerplate} boilerplate and "
+                f"{self.repeats} repeated paragraphs dropped, "
+                f"{len(self.hosts)} hosts learned")
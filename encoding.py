@@ -0,0 +1,199 @@
+import codecs
+import re
+import unicodedata
+
+
+# -- input: which charset a page is in ----------------------------------------
+
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+META_CHARSET = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# Labels browsers read as windows-1252 (its extra quotes and dashes
+# turn up in "latin-1" pages all the time)
+WINDOWS_1252 = frozenset(['iso-8859-1', 'iso8859-1', 'latin1', 'latin-1',
+                          'us-ascii', 'ascii', 'l1', 'cp819'])
+
+
+def codec_for(label):
+    """Python codec for a charset label, or None if there isn't one"""
+    label = label.strip().lower()
+    if label in WINDOWS_1252:
+        return 'cp1252'
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(head, content_type=''):
+    """Charset of a page from its first bytes and Content-Type, without guessing
+
+    A byte order mark wins, then the header's charset, then a <meta> in
+    the first 1024 bytes (as browsers do); anything else is read as UTF-8.
+    Statistical detection (what requests does for resp.text when there's
+    no charset) is slow on big pages and often wrong on short ones.
+    """
+    for bom, codec in BOMS:
+        if head.startswith(bom):
+            return codec
+    match = HEADER_CHARSET.search(content_type or '')
+    if match and codec_for(match.group(1)):
+        return codec_for(match.group(1))
+    match = META_CHARSET.search(head[:1024])
+    if match:
+        codec = codec_for(match.group(1).decode('ascii', 'ignore'))
+        # A page that made it here as bytes can't really be UTF-16
+        if codec and not codec.startswith('utf-16'):
+            return codec
+    return 'utf-8'
+
+
+# -- output: what the Game.com can show ---------------------------------------
+
+# Punctuation, symbols and letters that don't decompose to ASCII
+SYMBOLS = {
+    '‘': "'", '’': "'", '‚': "'", '‛': "'", '′': "'",
+    '´': "'",
+    '“': '"', '”': '"', '„': '"', '‟': '"', '″': '"',
+    '«': '<<', '»': '>>', '‹': '<', '›': '>',
+    '‐': '-', '‑': '-', '‒': '-', '–': '-', '−': '-',
+    '—': '--', '―': '--',
+    '…': '...', '•': '*', '‣': '*', '●': '*', '·': '.',
+    '⁄': '/', '∕': '/',
+    '\xa0': ' ', '\u202f': ' ', '\u2007': ' ', '\u3000': ' ',
+    # Soft hyphen, zero-width spaces and joiners, BOM, emoji variation selectors
+    '\xad': '', '\u200b': '', '\u200c': '', '\u200d': '', '\u2060': '',
+    '\ufeff': '', '\ufe0e': '', '\ufe0f': '',
+    '©': '(c)', '®': '(R)', '™': '(TM)', '℗': '(P)',
+    '°': ' deg', '±': '+/-', '×': 'x', '÷': '/',
+    '¢': 'c', '£': 'GBP', '¥': 'JPY', '€': 'EUR',
+    '₤': 'L', '₹': 'Rs', '₽': 'RUB', '¤': '$',
+    '§': 'S.', '¶': 'P.', '†': '+', '‡': '++',
+    '‰': '%o', '¿': '?', '¡': '!', '¬': '!', '¦': '|',
+    '←': '<-', '→': '->', '↔': '<->', '⇒': '=>',
+    '↑': '^', '↓': 'v', '≤': '<=', '≥': '>=',
+    '≠': '!=', '≈': '~', '∞': 'inf', '✓': 'v', '✔': 'v',
+    'ß': 'ss', 'ẞ': 'SS', 'æ': 'ae', 'Æ': 'AE',
+    'œ': 'oe', 'Œ': 'OE', 'ø': 'o', 'Ø': 'O',
+    'đ': 'd', 'Đ': 'D', 'ł': 'l', 'Ł': 'L',
+    'þ': 'th', 'Þ': 'Th', 'ð': 'd', 'Ð': 'D',
+    'ı': 'i', 'ħ': 'h', 'Ħ': 'H', 'ŋ': 'ng', 'Ŋ': 'Ng',
+}
+
+# Russian/Ukrainian/Bulgarian, after the common news-style romanization
+CYRILLIC = dict(zip(
+    'абвгдеёжзийклмнопрстуфхцчшщъыьэюяіїєґў',
+    ['a', 'b', 'v', 'g', 'd', 'e', 'e', 'zh', 'z', 'i', 'y', 'k', 'l', 'm',
+     'n', 'o', 'p', 'r', 's', 't', 'u', 'f', 'kh', 'ts', 'ch', 'sh', 'shch',
+     '', 'y', '', 'e', 'yu', 'ya', 'i', 'yi', 'ye', 'g', 'w']))
+GREEK = dict(zip(
+    'αβγδεζηθικλμνξοπρσςτυφχψω',
+    ['a', 'v', 'g', 'd', 'e', 'z', 'i', 'th', 'i', 'k', 'l', 'm', 'n', 'x',
+     'o', 'p', 'r', 's', 's', 't', 'y', 'f', 'ch', 'ps', 'o']))
+
+# Blocks worth a table entry: Latin-1 and Latin Extended, Greek, Cyrillic,
+# Vietnamese, general punctuation to enclosed numbers, bullets and dingbats,
+# ligatures, fullwidth forms
+RANGES = ((0x00a0, 0x0250), (0x0370, 0x0400), (0x0400, 0x0460),
+          (0x1e00, 0x1f00), (0x2000, 0x2500), (0x25a0, 0x2800),
+          (0x3000, 0x3001), (0xfb00, 0xfb07), (0xfe0e, 0xfe10),
+          (0xfeff, 0xff00), (0xff01, 0xff5f))
+
+
+def letter(char):
+    """ASCII for one character after decomposition, or None"""
+    if char.isascii():
+        return char
+    if char in SYMBOLS:
+        return SYMBOLS[char]
+    lower = char.lower()
+    for table in (CYRILLIC, GREEK):
+        if lower in table:
+            text = table[lower]
+            return text.capitalize() if char != lower else text
+    return None
+
+
+def transliteration(char):
+    """ASCII replacement for char, or None to leave it to the '?' pass"""
+    text = letter(char)
+    if text is not None:
+        return text
+    parts = []
+    for part in unicodedata.normalize('NFKD', char):
+        if unicodedata.combining(part):
+            continue
+        text = letter(part)
+        if text is None:
+            return None
+        parts.append(text)
+    return ''.join(parts) if parts else None
+
+
+def build_table():
+    """ASCII_TABLE's contents"""
+    table = {}
+    for start, stop in RANGES:
+        for code in range(start, stop):
+            text = transliteration(chr(code))
+            if text is not None:
+                table[code] = text
+    return table
+
+
+# str.translate() table, filled in by the first page that needs it (the
+# build takes a few ms, which startup doesn't need to spend)
+ASCII_TABLE = {}
+NON_ASCII = re.compile(r'[^\x00-\x7f]+')
+
+
+def ascii_table():
+    if not ASCII_TABLE:
+        # One C call, so other threads see all of it or none
+        ASCII_TABLE.update(build_table())
+    return ASCII_TABLE
+
+
+def transliterate_run(error):
+    """Codec error handler: ASCII for a run of characters encode() choked on"""
+    text = error.object[error.start:error.end].translate(ascii_table())
+    if not text.isascii():
+        text = NON_ASCII.sub('?', text)
+    return text, error.end
+
+
+codecs.register_error('gamecom-ascii', transliterate_run)
+
+
+def to_ascii(text):
+    """text as the Game.com can show it
+
+    Characters with a sensible ASCII spelling get it (curly quotes,
+    dashes, accents, Cyrillic, Greek, ...); every run of anything else
+    (emoji, CJK) becomes one '?', so nothing vanishes silently.
+    """
+    if text.isascii():
+        return text
+    encoded = text.encode('ascii', 'ignore')
+    if len(text) - len(encoded) > len(text) >> 5:
+        # Mostly non-Latin: one translate() over the lot
+        text = text.translate(ascii_table())
+        return text if text.isascii() else NON_ASCII.sub('?', text)
+    # Mostly ASCII: the encoder copies it at C speed and hands us the
+    # odd quote or accent
+    return text.encode('ascii', 'gamecom-ascii').decode('ascii')
+
+
+def ascii_page(page):
+    """A distilled page with its title, paragraphs and link texts in ASCII"""
+    return {
+        'url': page['url'],
+        'title': to_ascii(page['title']),
+        'content': [to_ascii(text) for text in page['content']],
+        'links': [{'url': link['url'], 'text': to_ascii(link['text'])}
+                  for link in page['links']],
+    }
@@ -0,0 +1,430 @@
+import re
+from html.parser import HTMLParser
+from importlib.util import find_spec
+from urllib.parse import urljoin
+
+from encoding import ascii_page
+
+# lxml itself is imported by the first LxmlExtractor, not at startup
+HAVE_LXML = find_spec('lxml') is not None
+
+
+# Elements the gateway never shows (same list the BeautifulSoup path drops)
+SKIP_TAGS = frozenset(['script', 'style', 'nav', 'footer', 'header', 'iframe'])
+CONTENT_CLASS = re.compile('content|article|post|entry', re.I)
+
+# Candidate main-content containers, best first: the first <article>, the
+# first <main>, the first content-ish <div>, then <body>
+ARTICLE, MAIN, CONTENT_DIV, BODY = 1, 2, 4, 8
+CONTAINERS = (ARTICLE, MAIN, CONTENT_DIV, BODY)
+
+MAX_LINKS = 20
+
+
+def chunk_text(text, size=200):
+    """Split text into chunks of about size characters on word boundaries"""
+    chunks = []
+    words = text.split()
+    chunk = []
+    current_length = 0
+    for word in words:
+        if current_length + len(word) + 1 > size and chunk:
+            chunks.append(' '.join(chunk))
+            chunk = [word]
+            current_length = len(word)
+        else:
+            chunk.append(word)
+            current_length += len(word) + 1
+    if chunk:
+        chunks.append(' '.join(chunk))
+    return chunks
+
+
+class Distiller:
+    """Single-pass distiller driven by parser events
+
+    Turns start/end/data events into the page shape the gateway shows
+    (title, content paragraphs, up to 20 links), following the same rules
+    as the BeautifulSoup pipeline: drop script/style/nav/footer/header/
+    iframe, take paragraphs from the first <article>, else <main>, else
+    content-ish <div>, else <body>, and fall back to ~200 character chunks
+    of that container's text when it has no <p> at all. The result is
+    transliterated to ASCII (ascii_page) for the device.
+
+    If max_paragraphs is set, done becomes true once that many main
+    content paragraphs and a full set of links have been seen, so a
+    streaming caller can stop downloading.
+    """
+
+    def __init__(self, base_url, max_paragraphs=None, max_fallback_chars=20000):
+        self.base_url = base_url
+        self.max_paragraphs = max_paragraphs
+        self.max_fallback_chars = max_fallback_chars
+        self.done = False
+
+        self.title = None
+        self.title_parts = None
+        self.skip = 0
+        # Which containers we're inside (bitmask), which ones have been
+        # seen at all, and the nesting depth at which each one closes
+        self.inside = 0
+        self.seen = 0
+        self.depth = {'article': 0, 'main': 0, 'div': 0, 'body': 0}
+        self.close_at = {}
+
+        self.p_parts = None
+        self.p_mask = 0
+        self.p_seen = 0
+        self.paragraphs = []
+        self.counts = dict.fromkeys(CONTAINERS, 0)
+        self.text_parts = []
+        self.text_chars = 0
+
+        self.link = None
+        self.links = []
+        self.seen_urls = set()
+
+    # -- parser events ------------------------------------------------------
+
+    def start(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+            return
+        if self.skip:
+            return
+
+        if tag in self.depth:
+            self.depth[tag] += 1
+            bit = self.container_bit(tag, attrs)
+            if bit and not self.seen & bit:
+                self.seen |= bit
+                self.inside |= bit
+                self.close_at[bit] = (tag, self.depth[tag])
+        elif tag == 'p':
+            self.end_paragraph()
+            self.p_parts = []
+            self.p_mask = self.inside | BODY
+            self.p_seen |= self.p_mask
+        elif tag == 'a':
+            href = attrs.get('href')
+            if href:
+                self.link = (href, [])
+        elif tag == 'title' and self.title is None:
+            self.title_parts = []
+
+    def end(self, tag):
+        if tag in SKIP_TAGS:
+            if self.skip:
+                self.skip -= 1
+            return
+        if self.skip:
+            return
+
+        if tag in self.depth:
+            for bit, (open_tag, level) in list(self.close_at.items()):
+                if open_tag == tag and self.depth[tag] == level:
+                    self.inside &= ~bit
+                    del self.close_at[bit]
+            if self.depth[tag]:
+                self.depth[tag] -= 1
+            self.end_paragraph()
+        elif tag == 'p':
+            self.end_paragraph()
+        elif tag == 'a':
+            if self.link is not None:
+                self.end_link()
+        elif tag == 'title' and self.title_parts is not None:
+            self.title = ''.join(self.title_parts).strip()[:40]
+            self.title_parts = None
+
+    def data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+            return
+        if self.skip:
+            return
+        if self.p_parts is not None:
+            self.p_parts.append(data)
+        if self.link is not None:
+            self.link[1].append(data)
+        if self.max_fallback_chars is None or self.text_chars < self.max_fallback_chars:
+            self.text_parts.append((data, self.inside | BODY))
+            self.text_chars += len(data)
+
+    def close(self):
+        return self.page()
+
+    # -- helpers ------------------------------------------------------------
+
+    def container_bit(self, tag, attrs):
+        if tag == 'article':
+            return ARTICLE
+        if tag == 'main':
+            return MAIN
+        if tag == 'body':
+            return BODY
+        if CONTENT_CLASS.search(attrs.get('class') or ''):
+            return CONTENT_DIV
+        return 0
+
+    def end_paragraph(self):
+        if self.p_parts is None:
+            return
+        text = ''.join(self.p_parts).strip()
+        self.p_parts = None
+        if len(text) > 20:
+            self.paragraphs.append((text, self.p_mask))
+            for bit in CONTAINERS:
+                if self.p_mask & bit:
+                    self.counts[bit] += 1
+            self.check_done()
+
+    def end_link(self):
+        href, parts = self.link
+        self.link = None
+        if len(self.links) >= MAX_LINKS:
+            return
+        if href.startswith('#') or href.startswith('javascript:'):
+            return
+        try:
+            absolute_url = urljoin(self.base_url, href)
+        except ValueError:
+            return
+        if absolute_url in self.seen_urls:
+            return
+        self.seen_urls.add(absolute_url)
+        text = ''.join(parts).strip() or href
+        self.links.append({'url': absolute_url, 'text': text[:40]})
+        self.check_done()
+
+    def main_container(self):
+        """Best container opened so far (BODY if none)"""
+        for bit in CONTAINERS:
+            if self.seen & bit:
+                return bit
+        return BODY
+
+    def check_done(self):
+        if (self.max_paragraphs and len(self.links) >= MAX_LINKS and
+                self.counts[self.main_container()] >= self.max_paragraphs):
+            self.done = True
+
+    # -- result -------------------------------------------------------------
+
+    def preview(self):
+        """Title, paragraphs and links so far, while the document arrives
+
+        Unlike page(), finishes nothing: an open paragraph stays open, so
+        parsing can carry on afterwards.
+        """
+        main = self.main_container()
+        return ascii_page({
+            'url': self.base_url,
+            'title': self.title or '',
+            'content': [text for text, mask in self.paragraphs if mask & main],
+            'links': self.links,
+        })
+
+    def page(self):
+        """The distilled page, from whatever has been seen so far"""
+        self.end_paragraph()
+        main = self.main_container()
+        content = [text for text, mask in self.paragraphs if mask & main]
+        if self.max_paragraphs:
+            content = content[:self.max_paragraphs]
+        if not self.p_seen & main:
+            # No <p> at all: fall back to the container's text
+            text = ''.join(data for data, mask in self.text_parts if mask & main)
+            content = chunk_text(re.sub(r'\s+', ' ', text).strip())
+        return ascii_page({
+            'url': self.base_url,
+            'title': self.title or '',
+            'content': content,
+            'links': self.links,
+        })
+
+
+class HtmlParserExtractor(HTMLParser):
+    """Feeds stdlib html.parser events to a Distiller"""
+
+    def __init__(self, distiller):
+        super().__init__(convert_charrefs=True)
+        self.distiller = distiller
+
+    def handle_starttag(self, tag, attrs):
+        self.distiller.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.distiller.end(tag)
+
+    def handle_data(self, data):
+        self.distiller.data(data)
+
+
+class LxmlExtractor:
+    """Feeds libxml2 HTML parser events to a Distiller (needs lxml)"""
+
+    def __init__(self, distiller):
+        from lxml import etree
+        self.distiller = distiller
+        self.parser = etree.HTMLParser(target=distiller)
+
+    def feed(self, text):
+        self.parser.feed(text)
+
+    def close(self):
+        self.parser.close()
+
+
+BACKENDS = {
+    'html.parser': HtmlParserExtractor,
+    'lxml': LxmlExtractor,
+}
+
+
+def available_backends():
+    """Parser backends usable in this install, fastest first"""
+    names = ['html.parser']
+    if HAVE_LXML:
+        names.insert(0, 'lxml')
+    return names
+
+
+def resolve_backend(name=None):
+    """Map a backend name (or None/'auto') to one that is installed
+
+    'bs4' selects the original BeautifulSoup pipeline in distill().
+    """
+    if name in (None, 'auto'):
+        return available_backends()[0]
+    if name == 'bs4':
+        return name
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown parser backend {name!r}')
+    if name == 'lxml' and not HAVE_LXML:
+        raise ValueError('lxml is not installed')
+    return name
+
+
+class PageExtractor:
+    """Incremental distiller: feed() HTML as it arrives, then page()"""
+
+    def __init__(self, base_url, max_paragraphs=40, backend=None,
+                 max_fallback_chars=20000):
+        self.distiller = Distiller(base_url, max_paragraphs, max_fallback_chars)
+        backend = resolve_backend(backend)
+        if backend not in BACKENDS:
+            # bs4 can't parse incrementally
+            backend = available_backends()[0]
+        self.parser = BACKENDS[backend](self.distiller)
+
+    @property
+    def done(self):
+        return self.distiller.done
+
+    def feed(self, text):
+        self.parser.feed(text)
+
+    def preview(self):
+        return self.distiller.preview()
+
+    def page(self):
+        try:
+            self.parser.close()
+        except Exception:
+            # Truncated documents may not close cleanly; keep what we have
+            pass
+        return self.distiller.page()
+
+
+def distill(html, url, backend=None):
+    """Distill a whole document in one pass"""
+    if resolve_backend(backend) == 'bs4':
+        return distill_soup(html, url)
+    extractor = PageExtractor(url, max_paragraphs=None, backend=backend,
+                              max_fallback_chars=None)
+    extractor.feed(html)
+    return extractor.page()
+
+
+def extract_links(soup, base_url):
+    """Extract links from page"""
+    links = []
+    seen_urls = set()
+    
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        text = link.get_text().strip()
+        
+        if not href or href.startswith('#') or href.startswith('javascript:'):
+            continue
+        
+        try:
+            absolute_url = urljoin(base_url, href)
+        except:
+            continue
+        
+        if absolute_url in seen_urls:
+            continue
+        
+        seen_urls.add(absolute_url)
+        
+        if not text:
+            text = href
+        text = text[:40]
+        
+        links.append({
+            'url': absolute_url,
+            'text': text
+        })
+        
+        if len(links) >= MAX_LINKS:
+            break
+    
+    return links
+
+
+def distill_soup(html, url):
+    """The original multi-pass BeautifulSoup pipeline (parser='bs4')"""
+    # Only this pipeline needs bs4, so it isn't loaded at startup
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    for script in soup(["script", "style", "nav", "footer", "header", "iframe"]):
+        script.decompose()
+    
+    title_text = ''
+    title = soup.find('title')
+    if title:
+        title_text = title.get_text().strip()[:40]
+    
+    main_content = (
+        soup.find('article') or 
+        soup.find('main') or 
+        soup.find('div', class_=CONTENT_CLASS) or
+        soup.find('body')
+    )
+    
+    # Extract content paragraphs
+    content = []
+    if main_content:
+        paragraphs = main_content.find_all('p')
+        
+        if paragraphs:
+            for p in paragraphs:
+                text = p.get_text().strip()
+                if len(text) > 20:
+                    content.append(text)
+        else:
+            # Fallback to body text, split into ~200 char chunks
+            text = main_content.get_text()
+            text = re.sub(r'\s+', ' ', text).strip()
+            content = chunk_text(text)
+    
+    return ascii_page({
+        'url': url,
+        'title': title_text,
+        'content': content,
+        # Extract links for later
+        'links': extract_links(soup, url),
+    })
@@ -0,0 +1,280 @@
+import html
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from encoding import to_ascii
+
+
+class Snapshot:
+    """One load of a feed: parallel lists of titles and links"""
+
+    def __init__(self, titles, links, source):
+        # Converted for the device once per load, not on every screen
+        self.titles = [to_ascii(title) for title in titles]
+        self.links = links
+        # 'api', 'html' or 'pack'
+        self.source = source
+        self.fetched = time.time()
+
+    @property
+    def listing(self):
+        return self.titles, self.links
+
+    @property
+    def age(self):
+        return time.time() - self.fetched
+
+
+class Feed:
+    """A menu listing, loaded from a JSON API with HTML scraping as fallback
+
+    Subclasses set name/label/interval and implement load_api() and
+    load_html(), each returning (titles, links). http is the gateway's
+    HttpCache; listing requests use ttl=0 so a refresh always revalidates.
+    """
+
+    name = ''
+    label = ''
+    # Seconds between background refreshes
+    interval = 60
+
+    def __init__(self, http, limit=15):
+        self.http = http
+        self.limit = limit
+
+    def load(self):
+        """Fresh Snapshot of the feed, from the API if it answers"""
+        if self.has_api():
+            try:
+                with metrics.span(f'{self.name}.api'):
+                    titles, links = self.load_api()
+                if titles:
+                    return Snapshot(titles, links, 'api')
+            except Exception as e:
+                print(f"{self.label} API failed ({str(e)[:60]}), scraping instead")
+        titles, links = self.load_html()
+        return Snapshot(titles, links, 'html')
+
+    def has_api(self):
+        return False
+
+    def get_json(self, url, **kwargs):
+        resp = self.http.get(url, **kwargs)
+        if resp.status_code != 200:
+            raise ValueError(f'HTTP Error {resp.status_code}')
+        return json.loads(resp.text)
+
+    def load_api(self):
+        raise NotImplementedError
+
+    def load_html(self):
+        raise NotImplementedError
+
+
+class HackerNewsFeed(Feed):
+    """HN front page: Firebase API (topstories + items), else .titleline"""
+
+    name = 'hn'
+    label = 'HN'
+    interval = 60
+
+    def __init__(self, http, base='https://news.ycombinator.com/',
+                 api='https://hacker-news.firebaseio.com/v0/', limit=15):
+        super().__init__(http, limit)
+        self.base = base
+        self.api = api
+
+    def has_api(self):
+        return bool(self.api)
+
+    def load_api(self):
+        ids = self.get_json(self.api + 'topstories.json', ttl=0)[:self.limit]
+        # Items hardly change; they come from the HTTP cache after the first load
+        with ThreadPoolExecutor(8) as pool:
+            items = list(pool.map(self.load_item, ids))
+        titles = []
+        links = []
+        for item in items:
+            if item and item.get('title'):
+                titles.append(item['title'])
+                # Ask/Show HN posts have no url; link to the discussion
+                links.append(item.get('url') or f"item?id={item['id']}")
+        return titles, links
+
+    def load_item(self, item_id):
+        try:
+            return self.get_json(f'{self.api}item/{item_id}.json')
+        except Exception:
+            return None
+
+    def load_html(self):
+        """Scrape Hacker News front page into (titles, links)"""
+        with metrics.span('hn.http'):
+            resp = self.http.get(self.base, ttl=0)
+        from bs4 import BeautifulSoup
+        with metrics.span('hn.parse'):
+            soup = BeautifulSoup(resp.text, 'html.parser')
+
+            stories = []
+            story_links = []
+
+            for item in soup.select('.titleline')[:self.limit]:
+                link = item.find('a')
+                if link:
+                    title = link.get_text()
+                    href = link.get('href', '')
+                    stories.append(title)
+                    story_links.append(href)
+
+        return stories, story_links
+
+
+class RedditFeed(Feed):
+    """A subreddit: its .json listing, else old.reddit .thing scraping"""
+
+    name = 'reddit'
+    label = 'Reddit'
+    interval = 120
+
+    def __init__(self, http, url='https://old.reddit.com/r/technology',
+                 api=True, limit=15):
+        super().__init__(http, limit)
+        self.url = url
+        self.api = api
+
+    def has_api(self):
+        return self.api
+
+    def load_api(self):
+        data = self.get_json(f'{self.url}.json?limit={self.limit}', ttl=0)
+        titles = []
+        posts = []
+        for child in data['data']['children'][:self.limit]:
+            post = child['data']
+            # Reddit JSON escapes &, < and > in titles
+            titles.append(html.unescape(post['title']))
+            posts.append(post.get('url') or post.get('permalink', ''))
+        return titles, posts
+
+    def load_html(self):
+        """Scrape the subreddit into (titles, links)"""
+        with metrics.span('reddit.http'):
+            resp = self.http.get(self.url, ttl=0)
+        from bs4 import BeautifulSoup
+        with metrics.span('reddit.parse'):
+            soup = BeautifulSoup(resp.text, 'html.parser')
+
+            titles = []
+            posts = []
+
+            for post in soup.select('.thing')[:self.limit]:
+                title_elem = post.select_one('.title')
+                if title_elem:
+                    title = title_elem.get_text().strip()
+                    link = title_elem.find('a')
+                    url = link.get('href', '') if link else ''
+                    titles.append(title)
+                    posts.append(url)
+
+        return titles, posts
+
+
+class FeedStore:
+    """Latest snapshot of every feed, kept fresh by a background thread
+
+    latest() never blocks: it returns the current snapshot, or None if
+    there is none yet or it is older than max_age intervals (say the
+    background refresh keeps failing). get() loads in the foreground in
+    that case. Concurrent loads of one feed are collapsed into one.
+    """
+
+    def __init__(self, feeds, max_age=5):
+        self.feeds = {feed.name: feed for feed in feeds}
+        self.max_age = max_age
+        self.snapshots = {}
+        self.locks = {name: threading.Lock() for name in self.feeds}
+        self.thread = None
+        self.stopping = threading.Event()
+        self.refreshes = 0
+        self.failures = 0
+        self.instant = 0
+
+    def latest(self, name):
+        """Current snapshot of feed name, or None if there's no usable one"""
+        snapshot = self.snapshots.get(name)
+        if snapshot is None:
+            return None
+        if snapshot.age > self.feeds[name].interval * self.max_age:
+            return None
+        self.instant += 1
+        return snapshot
+
+    def seed(self, name, titles, links, source='pack'):
+        """Use (titles, links) until feed name has been loaded for real"""
+        if name in self.feeds and name not in self.snapshots:
+            snapshot = Snapshot(titles, links, source)
+            # Due for a refresh straight away
+            snapshot.fetched -= self.feeds[name].interval
+            self.snapshots[name] = snapshot
+
+    def get(self, name):
+        """Snapshot of feed name, loading it now if there's no usable one"""
+        snapshot = self.latest(name)
+        if snapshot is None:
+            snapshot = self.refresh(name, waited_on=True)
+        return snapshot
+
+    def refresh(self, name, waited_on=False):
+        """Load feed name and make it current"""
+        lock = self.locks[name]
+        started = time.time()
+        with lock:
+            # Someone else refreshed it while we waited for the lock
+            snapshot = self.snapshots.get(name)
+            if snapshot is not None and snapshot.fetched >= started:
+                return snapshot
+            try:
+                with metrics.span('feed.refresh'):
+                    snapshot = self.feeds[name].load()
+            except Exception as e:
+                self.failures += 1
+                if waited_on:
+                    raise
+                print(f"Refreshing {name} failed: {str(e)[:60]}")
+                return self.snapshots.get(name)
+            self.snapshots[name] = snapshot
+            self.refreshes += 1
+            return snapshot
+
+    def start(self):
+        """Start refreshing in the background (once)"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True,
+                                           name='feeds')
+            self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopping.is_set():
+            now = time.time()
+            wait = min(feed.interval for feed in self.feeds.values())
+            for name, feed in self.feeds.items():
+                snapshot = self.snapshots.get(name)
+                due = 0 if snapshot is None else feed.interval - snapshot.age
+                if due <= 0:
+                    self.refresh(name)
+                    due = feed.interval
+                wait = min(wait, due)
+            self.stopping.wait(max(1.0, wait - (time.time() - now)))
+
+    def stop(self):
+        self.stopping.set()
+
+    def summary(self):
+        sources = ', '.join(f'{name} via {snap.source}'
+                            for name, snap in sorted(self.snapshots.items()))
+        return (f"Feeds: {self.refreshes} refreshes, {self.failures} failed, "
+                f"{self.instant} served from memory ({sources or 'none loaded'})")
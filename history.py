@@ -0,0 +1,52 @@
+from collections import deque
+
+from pagecache import pack_page, unpack_page
+
+
+class History:
+    """Where one session has been, newest last, for the Back command
+
+    Pages are kept distilled and zlib-compressed (pack_page), along with
+    the screen the user was on, so going back needs no network or parsing.
+    A page left before it had all loaded is marked partial, for the
+    gateway to load again (from the HTTP cache, by then) on the way back.
+    Listings (HN, Reddit, search results) are kept as just the menu and
+    screen, since their items stay on the session. The oldest entries are
+    dropped once the packed pages pass max_bytes.
+    """
+
+    def __init__(self, max_bytes=128 * 1024, max_entries=50):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # (menu, packed page or None, screen, viewing_links, partial)
+        self.entries = deque()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push_page(self, page, screen, viewing_links, partial=False):
+        self.push(('page', pack_page(page), screen, viewing_links, partial))
+
+    def push_listing(self, menu, screen):
+        self.push((menu, None, screen, False, False))
+
+    def push(self, entry):
+        self.entries.append(entry)
+        self.size += len(entry[1] or b'')
+        while self.entries and (self.size > self.max_bytes or
+                                len(self.entries) > self.max_entries):
+            self.size -= len(self.entries.popleft()[1] or b'')
+
+    def pop(self):
+        """(menu, page dict or None, screen, viewing_links, partial), or None"""
+        if not self.entries:
+            return None
+        menu, data, screen, viewing_links, partial = self.entries.pop()
+        self.size -= len(data or b'')
+        return (menu, unpack_page(data) if data else None, screen, viewing_links,
+                partial)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
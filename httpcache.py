@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+from encoding import sniff_encoding
+
+
+# Seconds a response stays fresh, by host. Listings change often, articles
+# hardly ever.
+DEFAULT_TTLS = {
+    'news.ycombinator.com': 60,
+    'old.reddit.com': 120,
+}
+DEFAULT_TTL = 600
+
+
+def normalize_url(url):
+    """Cache key for url: lowercase scheme/host, no default port or fragment"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or
+                     (scheme == 'https' and port == 443)):
+        host = f'{host}:{port}'
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+class CachedResponse:
+    """The parts of a requests.Response the gateway uses"""
+
+    def __init__(self, url, status_code, text, headers, nbytes):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.nbytes = nbytes
+        self.fetched = time.time()
+        self.from_cache = False
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'status_code': self.status_code,
+            'text': self.text,
+            'headers': self.headers,
+            'nbytes': self.nbytes,
+            'fetched': self.fetched,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        resp = cls(d['url'], d['status_code'], d['text'], d['headers'], d['nbytes'])
+        resp.fetched = d['fetched']
+        return resp
+
+
+class DiskCache:
+    """Second cache tier: one JSON file per URL, oldest evicted first
+
+    Writes are serialized and land through a temp file and os.replace(),
+    so a reader never sees half a file. The disk is only ever a cache: a
+    file that can't be read is a miss, and one that can't be written (a
+    full disk, say) is skipped.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(path))
+        self.lock = threading.Lock()
+        self.errors = 0
+
+    def filename(self, key):
+        return os.path.join(self.path, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self.filename(key), encoding='utf-8') as f:
+                return CachedResponse.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, resp):
+        name = self.filename(key)
+        tmp = name + '.tmp'
+        data = json.dumps(resp.to_dict()).encode('utf-8')
+        with self.lock:
+            try:
+                old = os.path.getsize(name)
+            except OSError:
+                old = 0
+            try:
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, name)
+            except OSError:
+                self.errors += 1
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                return
+            self.size += len(data) - old
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """Drop least recently written files until under max_bytes (lock held)"""
+        entries = []
+        try:
+            for entry in os.scandir(self.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            self.errors += 1
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
+class HttpCache:
+    """Bounded LRU cache in front of an HttpClient (or requests.get)
+
+    Fresh entries are served without touching the network. Stale ones are
+    revalidated with If-None-Match / If-Modified-Since, and a 304 just
+    renews them. If revalidation fails outright the stale copy is served,
+    which beats an error on a flaky link. Only 200 responses are cached.
+
+    get() takes the same arguments as requests.get (plus ttl), so it can
+    stand in anywhere the gateway expects an HTTP getter. Without an http
+    getter an HttpClient is made on the first miss, so requests isn't
+    loaded until something is actually fetched.
+    """
+
+    def __init__(self, http=None, max_entries=256, max_bytes=16 * 1024 * 1024,
+                 disk_dir=None, ttls=None, default_ttl=DEFAULT_TTL):
+        self.http = http
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = DiskCache(disk_dir) if disk_dir else None
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stale_served = 0
+        self.bytes_from_cache = 0
+        self.bytes_fetched = 0
+
+    def client(self):
+        """The getter behind the cache, made on first use"""
+        with self.lock:
+            if self.http is None:
+                from httpclient import HttpClient
+                self.http = HttpClient()
+            return self.http
+
+    def ttl_for(self, key):
+        return self.ttls.get(urlsplit(key).hostname, self.default_ttl)
+
+    def lookup(self, key):
+        """Find an entry in memory, then on disk (promoting it to memory)"""
+        with self.lock:
+            resp = self.entries.get(key)
+            if resp is not None:
+                self.entries.move_to_end(key)
+                return resp
+        if self.disk:
+            resp = self.disk.get(key)
+            if resp is not None:
+                self.store(key, resp, to_disk=False)
+            return resp
+        return None
+
+    def store(self, key, resp, to_disk=True):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.text)
+            self.entries[key] = resp
+            self.size += len(resp.text)
+            while self.entries and (len(self.entries) > self.max_entries or
+                                    self.size > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.text)
+        if to_disk and self.disk:
+            self.disk.put(key, resp)
+
+    def get(self, url, headers=None, ttl=None, stream=False, **kwargs):
+        """Cached equivalent of requests.get(url, headers=..., **kwargs)
+
+        With stream=True a cache miss returns the live streaming response;
+        the caller reads the body and hands it back through remember().
+        """
+        key = normalize_url(url)
+        if ttl is None:
+            ttl = self.ttl_for(key)
+
+        cached = self.lookup(key)
+        if cached is not None and time.time() - cached.fetched < ttl:
+            with self.lock:
+                self.hits += 1
+                self.bytes_from_cache += cached.nbytes
+            cached.from_cache = True
+            return cached
+
+        headers = dict(headers or {})
+        if cached is not None:
+            if cached.headers.get('etag'):
+                headers['If-None-Match'] = cached.headers['etag']
+            if cached.headers.get('last-modified'):
+                headers['If-Modified-Since'] = cached.headers['last-modified']
+
+        http = self.client()
+        from requests.exceptions import RequestException
+        try:
+            resp = http.get(url, headers=headers, stream=stream, **kwargs)
+        except RequestException:
+            if cached is None:
+                raise
+            with self.lock:
+                self.stale_served += 1
+                self.bytes_from_cache += cached.nbytes
+            cached.from_cache = True
+            return cached
+
+        if resp.status_code == 304 and cached is not None:
+            resp.close()
+            with self.lock:
+                self.revalidated += 1
+                self.bytes_from_cache += cached.nbytes
+            cached.fetched = time.time()
+            cached.from_cache = True
+            self.store(key, cached)
+            return cached
+
+        with self.lock:
+            self.misses += 1
+        if stream:
+            return resp
+        # Decode as declared; left to itself resp.text guesses the charset
+        resp.encoding = sniff_encoding(resp.content[:1024],
+                                       resp.headers.get('content-type', ''))
+        return self.remember(url, resp, resp.text, len(resp.content))
+
+    def remember(self, url, resp, text, nbytes, complete=True):
+        """Account for a response body and cache it if it is whole and 200
+
+        Returns a CachedResponse (or resp itself if it wasn't cached).
+        """
+        with self.lock:
+            self.bytes_fetched += nbytes
+        if (not complete or resp.status_code != 200 or
+                'no-store' in resp.headers.get('cache-control', '')):
+            return resp
+
+        entry = CachedResponse(
+            resp.url,
+            resp.status_code,
+            text,
+            {name: resp.headers[name]
+             for name in ('etag', 'last-modified', 'content-type')
+             if name in resp.headers},
+            nbytes,
+        )
+        key = normalize_url(url)
+        self.store(key, entry)
+        # Later redirects to the same page hit the cache too
+        final_key = normalize_url(resp.url)
+        if final_key != key:
+            self.store(final_key, entry)
+        return entry
+
+    def stats(self):
+        """Counters for hit rate and bytes saved"""
+        return {
+            'entries': len(self.entries),
+            'bytes_cached': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'stale_served': self.stale_served,
+            'bytes_from_cache': self.bytes_from_cache,
+            'bytes_fetched': self.bytes_fetched,
+        }
+
+    def summary(self):
+        s = self.stats()
+        lookups = s['hits'] + s['misses'] + s['revalidated'] + s['stale_served']
+        rate = 100.0 * (lookups - s['misses']) / lookups if lookups else 0.0
+        return (f"HTTP cache: {s['entries']} entries, {rate:.0f}% served locally, "
+                f"{s['bytes_from_cache']} bytes saved, {s['bytes_fetched']} fetched")
@@ -0,0 +1,279 @@
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import (ConnectTimeoutError, NameResolutionError,
+                                NewConnectionError)
+from urllib3.util.connection import create_connection
+
+import metrics
+
+
+USER_AGENT = 'GameCom/1.0 (Retro Browser)'
+# Seconds to connect (TCP + TLS), and to wait for each read
+DEFAULT_TIMEOUT = (5, 15)
+# Answers worth another try: the server is busy or restarting
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+
+class Connector:
+    """Where new connections get their addresses: a DNS answer cache
+
+    getaddrinfo() doesn't report TTLs, so answers are kept for ttl
+    seconds, and dropped early if connecting to them fails.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.answers = {}
+        self.lookups = 0
+        self.hits = 0
+        self.connections = 0
+
+    def resolve(self, host, port):
+        """An address for host, from the cache if it's fresh"""
+        with self.lock:
+            self.lookups += 1
+            answer = self.answers.get(host)
+            if answer is not None and time.monotonic() < answer[1]:
+                self.hits += 1
+                return answer[0]
+        with metrics.span('http.dns'):
+            info = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        address = info[0][4][0]
+        with self.lock:
+            self.answers[host] = (address, time.monotonic() + self.ttl)
+        return address
+
+    def forget(self, host):
+        with self.lock:
+            self.answers.pop(host, None)
+
+
+connector = Connector()
+
+
+class CachedDnsConnection:
+    """Mixin for urllib3 connections: resolve through connector, time connects"""
+
+    def _new_conn(self):
+        # Only the socket goes to the cached address; _dns_host (and so
+        # self.host: Host header, SNI, certificate checks) stays the name.
+        # Errors are mapped the way urllib3's own _new_conn maps them.
+        name = self._dns_host
+        try:
+            address = connector.resolve(name, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        try:
+            return create_connection((address, self.port), self.timeout,
+                                     source_address=self.source_address,
+                                     socket_options=self.socket_options)
+        except socket.timeout as e:
+            connector.forget(name)
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. "
+                      f"(connect timeout={self.timeout})") from e
+        except OSError as e:
+            connector.forget(name)
+            raise NewConnectionError(
+                self, f"Failed to establish a new connection: {e}") from e
+
+    def connect(self):
+        with metrics.span('http.connect'):
+            super().connect()
+        with connector.lock:
+            connector.connections += 1
+
+
+class PooledHTTPConnection(CachedDnsConnection, HTTPConnection):
+    pass
+
+
+class PooledHTTPSConnection(CachedDnsConnection, HTTPSConnection):
+    pass
+
+
+class PooledHTTPPool(HTTPConnectionPool):
+    ConnectionCls = PooledHTTPConnection
+
+
+class PooledHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = PooledHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections use the DNS cache"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': PooledHTTPPool,
+            'https': PooledHTTPSPool,
+        }
+
+
+class RetryBudget:
+    """Retries allowed as a share of requests, so a sick site isn't hammered
+
+    Every request earns ratio of a retry and every retry spends one whole
+    one; reserve is what a quiet gateway starts with (and the most it can
+    save up).
+    """
+
+    def __init__(self, ratio=0.1, reserve=3):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+        self.lock = threading.Lock()
+
+    def earn(self):
+        with self.lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def spend(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class HttpClient:
+    """The gateway's one way onto the network
+
+    A requests.Session with keep-alive connection pools (one per host, up
+    to pool_hosts hosts), cached DNS answers, and at most per_host requests
+    in flight to any one host. Connection failures and busy answers
+    (429/502/503/504) are retried with exponential backoff, within a
+    RetryBudget. The User-Agent and timeouts are set here, not by callers.
+
+    get() has the requests.get() signature, so it slots in under HttpCache.
+    """
+
+    def __init__(self, per_host=6, pool_hosts=32, timeout=DEFAULT_TIMEOUT,
+                 retries=2, backoff=0.25, max_backoff=2.0, retry_ratio=0.1):
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = PooledAdapter(pool_connections=pool_hosts, pool_maxsize=per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = RetryBudget(retry_ratio)
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.requests = 0
+        self.retried = 0
+        self.retries_denied = 0
+
+    def slot(self, url):
+        """The semaphore limiting requests in flight to url's host"""
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            slot = self.slots.get(host)
+            if slot is None:
+                slot = self.slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def get(self, url, headers=None, timeout=None, stream=False, **kwargs):
+        """requests.get() through the pool
+
+        A streamed response keeps its host slot until it is closed.
+        """
+        slot = self.slot(url)
+        with metrics.span('http.slot_wait'):
+            slot.acquire()
+        try:
+            resp = self.send(url, headers, timeout or self.timeout, stream, kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        if not stream:
+            slot.release()
+            return resp
+
+        close = resp.close
+        held = [slot]
+
+        def release():
+            try:
+                close()
+            finally:
+                if held:
+                    held.pop().release()
+        resp.close = release
+        return resp
+
+    def send(self, url, headers, timeout, stream, kwargs):
+        """GET with retries; returns the last response or raises the last error"""
+        self.requests += 1
+        self.budget.earn()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url, headers=headers, timeout=timeout,
+                                        stream=stream, **kwargs)
+            except requests.exceptions.ConnectionError:
+                # Includes connect timeouts and pooled connections the server
+                # has since dropped; read timeouts aren't worth waiting twice
+                if not self.may_retry(attempt):
+                    raise
+                delay = self.delay(attempt)
+            else:
+                # Time to the response headers (connect included, if any)
+                metrics.observe('http.response', resp.elapsed.total_seconds())
+                if not stream:
+                    metrics.observe('http.read', max(
+                        0.0, time.perf_counter() - start - resp.elapsed.total_seconds()))
+                if resp.status_code not in RETRY_STATUSES:
+                    return resp
+                delay = max(self.delay(attempt), retry_after(resp))
+                if delay > self.max_backoff or not self.may_retry(attempt):
+                    return resp
+                resp.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def may_retry(self, attempt):
+        if attempt >= self.retries:
+            return False
+        if not self.budget.spend():
+            self.retries_denied += 1
+            metrics.count('http.retries_denied')
+            return False
+        self.retried += 1
+        metrics.count('http.retries')
+        return True
+
+    def delay(self, attempt):
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    def summary(self):
+        connections = connector.connections
+        reused = 100.0 * (1 - connections / self.requests) if self.requests else 0.0
+        return (f"HTTP client: {self.requests} requests on {connections} connections "
+                f"({max(0.0, reused):.0f}% reused), {self.retried} retries "
+                f"({self.retries_denied} over budget), DNS {connector.hits}/"
+                f"{connector.lookups} from cache")
+
+    def close(self):
+        self.session.close()
+
+
+def retry_after(resp):
+    """Seconds a Retry-After header asks for (0 if none or a date)"""
+    try:
+        return float(resp.headers.get('retry-after', 0))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,117 @@
+import textwrap
+from collections import OrderedDict
+
+
+def encode(lines):
+    """Join lines into the CRLF bytes the Game.com expects"""
+    return '\r\n'.join(lines).encode('ascii', errors='ignore')
+
+
+class ScreenLayout:
+    """Wraps text once and cuts it into ready-to-send screen frames
+
+    Content is laid out as frames of at most rows wrapped lines (instead
+    of one paragraph per screen), item lists as pages of per_page items.
+    Each frame is the complete CRLF byte string for that screen, so N/P
+    only has to replay a buffer. Results are memoized per list object, so
+    anything that replaces current_content or an item list with a new
+    list gets a fresh layout.
+    """
+
+    def __init__(self, width=30, rows=12, memo_size=8):
+        self.width = width
+        self.rows = rows
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+        self.wrapper = textwrap.TextWrapper(width=width, break_long_words=True)
+
+    def wrap(self, text):
+        """Wrapped lines for text"""
+        return self.wrapper.wrap(text) or ['']
+
+    def remember(self, key, source, frames):
+        self.memo[key] = (source, frames)
+        self.memo.move_to_end(key)
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return frames
+
+    def recall(self, key, source):
+        hit = self.memo.get(key)
+        if hit is not None and hit[0] is source:
+            self.memo.move_to_end(key)
+            return hit[1]
+        return None
+
+    def content_frames(self, paragraphs, has_links, partial=False):
+        """One frame per screenful of paragraphs, nav lines included
+
+        partial marks paragraphs that are only the start of a page still
+        loading: the count reads "1/2+" and the last frame offers N. Next.
+        """
+        key = ('content', id(paragraphs), has_links, partial, self.rows)
+        frames = self.recall(key, paragraphs)
+        if frames is not None:
+            return frames
+
+        lines = []
+        for text in paragraphs:
+            if lines:
+                lines.append('')
+            lines.extend(self.wrap(text))
+
+        screens = []
+        for start in range(0, len(lines), self.rows):
+            screen = lines[start:start + self.rows]
+            # Don't open or close a screen with the gap between paragraphs
+            while screen and not screen[0]:
+                screen = screen[1:]
+            while screen and not screen[-1]:
+                screen = screen[:-1]
+            if screen:
+                screens.append(screen)
+
+        frames = []
+        total = len(screens)
+        for i, screen in enumerate(screens):
+            out = ['', f"Content {i + 1}/{total}{'+' if partial else ''}", '']
+            out.extend(screen)
+            out.append('')
+            if i < total - 1 or partial:
+                out.append('N. Next')
+            elif has_links:
+                out.append('N. View Links')
+            else:
+                out.append('(End of content)')
+            if i > 0:
+                out.append('P. Previous')
+            out.append('U. New URL  M. Menu')
+            out.append('> ')
+            frames.append(encode(out))
+        return self.remember(key, paragraphs, frames)
+
+    def item_frames(self, items, per_page):
+        """One frame per page of numbered items, with P/N controls"""
+        key = ('items', id(items), per_page)
+        frames = self.recall(key, items)
+        if frames is not None:
+            return frames
+
+        frames = []
+        total = max(1, (len(items) + per_page - 1) // per_page)
+        for page in range(total):
+            start = page * per_page
+            out = ['', f'Page {page + 1}/{total}', '']
+            for i, item in enumerate(items[start:start + per_page], start=start + 1):
+                text = item['text'] if isinstance(item, dict) else item
+                out.extend(self.wrap(f"{i}. {text}"))
+                out.append('')
+            nav_options = []
+            if page > 0:
+                nav_options.append('P. Previous')
+            if start + per_page < len(items):
+                nav_options.append('N. Next')
+            if nav_options:
+                out.append(' | '.join(nav_options))
+            frames.append(encode(out) + b'\r\n')
+        return self.remember(key, items, frames)
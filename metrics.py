@@ -0,0 +1,306 @@
+import bisect
+import functools
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Histogram bucket upper bounds in seconds: 0.1 ms doubling up to ~52 s
+BUCKETS = [0.0001 * 2 ** i for i in range(20)]
+
+
+class Histogram:
+    """Count/sum/min/max plus log-spaced buckets for percentiles"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS[i] if i < len(BUCKETS) else self.max, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+        }
+
+
+class Metrics:
+    """Thread-safe registry of timing histograms and counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.add(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def span(self, name):
+        """Time the with-block into histogram name (errors included)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator form of span()"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'uptime': time.time() - self.started,
+                'timings': {name: hist.as_dict()
+                            for name, hist in sorted(self.histograms.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def report(self):
+        """Human-readable table of every stage"""
+        snap = self.snapshot()
+        lines = [f"{'stage':<20}{'count':>7}{'avg ms':>9}{'p50 ms':>9}"
+                 f"{'p95 ms':>9}{'max ms':>9}"]
+        for name, h in snap['timings'].items():
+            avg = h['sum'] / h['count'] if h['count'] else 0.0
+            lines.append(f"{name:<20}{h['count']:>7}{avg * 1000:>9.1f}"
+                         f"{h['p50'] * 1000:>9.1f}{h['p95'] * 1000:>9.1f}"
+                         f"{h['max'] * 1000:>9.1f}")
+        for name, value in snap['counters'].items():
+            lines.append(f"{name:<20}{value:>7}")
+        return '\n'.join(lines)
+
+    def prometheus(self):
+        """Prometheus text exposition of the snapshot"""
+        snap = self.snapshot()
+        out = []
+        for name, h in snap['timings'].items():
+            metric = 'gamecom_' + name.replace('.', '_') + '_seconds'
+            out.append(f'# TYPE {metric} summary')
+            out.append(f'{metric}{{quantile="0.5"}} {h["p50"]}')
+            out.append(f'{metric}{{quantile="0.95"}} {h["p95"]}')
+            out.append(f'{metric}_sum {h["sum"]}')
+            out.append(f'{metric}_count {h["count"]}')
+        for name, value in snap['counters'].items():
+            metric = 'gamecom_' + name.replace('.', '_') + '_total'
+            out.append(f'# TYPE {metric} counter')
+            out.append(f'{metric} {value}')
+        return '\n'.join(out) + '\n'
+
+
+class Profiler:
+    """On-demand cProfile of the gateway's hot paths
+
+    cProfile only sees the thread that enabled it, so every thread that
+    runs profiled code gets its own profile; stop() merges them. From
+    Python 3.12 cProfile sits on sys.monitoring, which allows one active
+    profiler per process: a call that can't enable its own runs unprofiled
+    and is counted as missed.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.lock = threading.Lock()
+        self.profiles = []
+        self.missed = 0
+        self.local = threading.local()
+
+    def start(self):
+        with self.lock:
+            self.profiles = []
+            self.missed = 0
+            self.active = True
+
+    def call(self, fn, *args):
+        """Run fn(*args), under the profiler if it is on"""
+        if not self.active:
+            return fn(*args)
+        if getattr(self.local, 'depth', 0):
+            return fn(*args)
+        profile = getattr(self.local, 'profile', None)
+        fresh = profile is None or profile not in self.profiles
+        if fresh:
+            import cProfile
+            profile = self.local.profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another thread's profile is active (Python 3.12+)
+            with self.lock:
+                self.missed += 1
+            return fn(*args)
+        if fresh:
+            with self.lock:
+                self.profiles.append(profile)
+        self.local.depth = 1
+        try:
+            return fn(*args)
+        finally:
+            profile.disable()
+            self.local.depth = 0
+
+    def stop(self, limit=30):
+        """Turn profiling off; returns the top functions by cumulative time"""
+        with self.lock:
+            self.active = False
+            profiles, self.profiles = self.profiles, []
+            missed = self.missed
+        note = ''
+        if missed:
+            note = f'{missed} calls not profiled: another profile was active\n'
+        if not profiles:
+            return note + 'No profile data\n'
+        import pstats
+        out = io.StringIO()
+        stats = pstats.Stats(profiles[0], stream=out)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return note + out.getvalue()
+
+
+def memory_start(frames=10):
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return 'tracemalloc started\n'
+
+
+def memory_report(limit=20):
+    """Top allocation sites since memory_start()"""
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        return 'tracemalloc is off\n'
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f'current {current} bytes, peak {peak} bytes']
+    for stat in tracemalloc.take_snapshot().statistics('lineno')[:limit]:
+        lines.append(str(stat))
+    return '\n'.join(lines) + '\n'
+
+
+registry = Metrics()
+profiler = Profiler()
+span = registry.span
+observe = registry.observe
+count = registry.count
+timed = registry.timed
+
+
+class MetricsServer:
+    """Local HTTP endpoint for metrics and profiling
+
+    GET /metrics            Prometheus text
+    GET /metrics.json       JSON snapshot
+    GET /stats              the console table
+    GET /profile/start      start cProfile
+    GET /profile/stop       stop and return the top functions
+    GET /memory/start       start tracemalloc
+    GET /memory             top allocation sites
+
+    http.server (and the profilers) are imported here rather than at the
+    top, so a gateway without --metrics-port doesn't load them at startup.
+    """
+
+    def __init__(self, port, host='127.0.0.1', extra=None):
+        from http.server import ThreadingHTTPServer
+        # extra() may return more lines (e.g. cache summaries) for /stats
+        self.extra = extra
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+
+    def handler(self):
+        from http.server import BaseHTTPRequestHandler
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                routes = {
+                    '/metrics': lambda: registry.prometheus(),
+                    '/metrics.json': lambda: json.dumps(registry.snapshot(), indent=2),
+                    '/stats': owner.stats_text,
+                    '/profile/start': lambda: (profiler.start(), 'profiling\n')[1],
+                    '/profile/stop': profiler.stop,
+                    '/memory/start': memory_start,
+                    '/memory': memory_report,
+                }
+                route = routes.get(self.path.split('?')[0])
+                if route is None:
+                    self.send_error(404)
+                    return
+                body = route().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def stats_text(self):
+        text = registry.report()
+        if self.extra:
+            text += '\n' + '\n'.join(self.extra())
+        return text + '\n'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True,
+                         name='metrics').start()
+        return self
+
+
+def dump_every(seconds, extra=None):
+    """Print the stats table to the console every few seconds"""
+    def loop():
+        while True:
+            time.sleep(seconds)
+            print(registry.report())
+            if extra:
+                for line in extra():
+                    print(line)
+    threading.Thread(target=loop, daemon=True, name='stats').start()
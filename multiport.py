@@ -0,0 +1,105 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from async_gateway import AsyncGameComGateway
+from feeds import FeedStore, HackerNewsFeed, RedditFeed
+from httpcache import HttpCache
+from httpclient import HttpClient
+from pagecache import PageCache
+from prefetch import Prefetcher
+
+
+class MultiPortGateway:
+    """Serve a bank of Game.com units from one process
+
+    Every port gets its own AsyncGameComGateway (and so its own Session),
+    but they all run on one event loop and share one HTTP cache (over one
+    pooled HttpClient) and one bounded pool of fetch threads. Idle
+    sessions cost nothing but a registered file descriptor.
+    """
+
+    def __init__(self, ports, baudrate=9600, max_fetches=8, cache_dir=None,
+                 prefetch=0, **options):
+        self.ports = list(ports)
+        self.baudrate = baudrate
+        self.max_fetches = max_fetches
+        self.client = HttpClient(per_host=max_fetches)
+        self.http = HttpCache(self.client, disk_dir=cache_dir)
+        self.pages = PageCache()
+        # One background refresh of each listing serves every unit
+        self.feeds = FeedStore([
+            HackerNewsFeed(self.http, AsyncGameComGateway.hn_base),
+            RedditFeed(self.http, AsyncGameComGateway.reddit_feed),
+        ])
+        self.prefetch = prefetch
+        # Extra GameComGateway settings for every session
+        self.options = options
+        self.prefetcher = None
+        self.gateways = []
+
+    def open_gateways(self):
+        """Open every port that is available, skipping the ones that aren't"""
+        for port in self.ports:
+            try:
+                gateway = AsyncGameComGateway(port=port, baudrate=self.baudrate,
+                                              http=self.http, pages=self.pages,
+                                              feeds=self.feeds,
+                                              **self.options)
+                gateway.log_prefix = f"[{port}] "
+                gateway.open_port()
+            except Exception as e:
+                print(f"[{port}] Not available: {e}")
+                continue
+            self.gateways.append(gateway)
+        if self.prefetch and self.gateways:
+            # Caches are shared, so any gateway's prefetch_page will do
+            self.prefetcher = Prefetcher(self.gateways[0].prefetch_page,
+                                         top_n=self.prefetch)
+            for gateway in self.gateways:
+                gateway.prefetcher = self.prefetcher
+
+    async def serve(self):
+        """Run every session until cancelled"""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(self.max_fetches))
+        self.feeds.start()
+        for gateway in self.gateways:
+            gateway.attach(loop)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for gateway in self.gateways:
+                gateway.detach()
+
+    def run(self):
+        """Main loop"""
+        self.open_gateways()
+        if not self.gateways:
+            print("No serial ports could be opened")
+            return
+        print(f"Game.com Web Gateway running on {len(self.gateways)} ports...")
+        self.gateways[0].report_ready()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+            for gateway in self.gateways:
+                gateway.close_port()
+                print(f"{gateway.log_prefix}{gateway.out.summary()}")
+            self.client.close()
+            print(self.http.summary())
+            print(self.client.summary())
+            print(self.pages.summary())
+            print(self.feeds.summary())
+            if self.options.get('search'):
+                print(self.options['search'].summary())
+            if self.options.get('condenser'):
+                print(self.options['condenser'].summary())
+            if self.options.get('parse_pool'):
+                print(self.options['parse_pool'].summary())
+                self.options['parse_pool'].close()
+            if self.prefetcher:
+                print(self.prefetcher.summary())
+                self.prefetcher.shutdown()
+            print(metrics.registry.report())
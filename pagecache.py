@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from httpcache import normalize_url
+
+
+def content_hash(text):
+    """Short fingerprint of a page's raw HTML"""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=12).digest()
+
+
+def pack_page(page):
+    """Serialize a distilled page to compressed bytes"""
+    fields = [page['url'], page['title'], page['content'],
+              [[link['url'], link['text']] for link in page['links']]]
+    return zlib.compress(json.dumps(fields, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack_page(data):
+    """Inverse of pack_page"""
+    url, title, content, links = json.loads(zlib.decompress(data))
+    return {
+        'url': url,
+        'title': title,
+        'content': content,
+        'links': [{'url': u, 'text': t} for u, t in links],
+    }
+
+
+class PageCache:
+    """LRU of distilled pages (title, paragraphs, links)
+
+    Entries are keyed by URL and tagged with a hash of the HTML they were
+    distilled from, so a page is only re-parsed when its content actually
+    changed. Pages are stored zlib-compressed; the size limit is on the
+    compressed bytes.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, digest):
+        """Distilled page for url if it was made from HTML with this digest"""
+        key = normalize_url(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != digest:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return unpack_page(entry[1])
+
+    def put(self, url, digest, page):
+        key = normalize_url(url)
+        data = pack_page(page)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[key] = (digest, data)
+            self.size += len(data)
+            while self.entries and (len(self.entries) > self.max_entries or
+                                    self.size > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted[1])
+
+    def summary(self):
+        return (f"Page cache: {len(self.entries)} pages, {self.size} bytes, "
+                f"{self.hits} hits, {self.misses} misses")
@@ -0,0 +1,118 @@
+import multiprocessing
+import threading
+import time
+
+from extract import distill
+
+# Workers are started again long after the gateway has threads (every
+# max_tasks pages, and on restart), and forking a threaded process can
+# deadlock the child on a lock some other thread held. A fork server is
+# started clean and forks the workers from there; spawn where there isn't one.
+START_METHOD = ('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+                else 'spawn')
+
+
+class ParseCancelled(Exception):
+    """The page being parsed is no longer wanted"""
+
+
+class ParsePool:
+    """Distill pages in worker processes so parsing never holds our GIL
+
+    Only the distilled page (title, paragraphs, links) comes back from a
+    worker. Pages under inline_bytes are parsed in-process, since shipping
+    them to a worker costs more than parsing them. Workers are replaced
+    after max_tasks pages to cap memory growth from fragmented parser
+    heaps.
+
+    cancel(owner) makes every parse waited on for owner raise
+    ParseCancelled straight away. A parse still running after timeout
+    seconds is treated as runaway: the whole pool is torn down and
+    restarted, and the page is reported as failed. Other pages caught in
+    the restart are parsed again on the new pool.
+    """
+
+    def __init__(self, workers=2, max_tasks=50, inline_bytes=32 * 1024,
+                 timeout=20.0):
+        self.workers = workers
+        self.max_tasks = max_tasks
+        self.inline_bytes = inline_bytes
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.context = multiprocessing.get_context(START_METHOD)
+        if START_METHOD == 'forkserver':
+            # So each worker starts with the parsers already imported
+            self.context.set_forkserver_preload(['extract'])
+        self.pool = self.start_pool()
+        # owner -> set of jobs being waited on; cancelled jobs
+        self.jobs = {}
+        self.cancelled = set()
+        self.inline = 0
+        self.offloaded = 0
+        self.restarts = 0
+
+    def start_pool(self):
+        return self.context.Pool(self.workers, maxtasksperchild=self.max_tasks)
+
+    def distill(self, html, url, backend=None, owner=None):
+        """Distilled page for html; blocks the calling thread only"""
+        if len(html) < self.inline_bytes:
+            with self.lock:
+                self.inline += 1
+            return distill(html, url, backend)
+
+        with self.lock:
+            self.offloaded += 1
+            pool, job = self.submit(html, url, backend, owner)
+
+        deadline = time.monotonic() + self.timeout
+        try:
+            while not job.ready():
+                job.wait(0.05)
+                if job in self.cancelled:
+                    raise ParseCancelled()
+                if pool is not self.pool:
+                    # Someone else's runaway page took our worker down:
+                    # start again on the new pool, with a fresh timeout
+                    with self.lock:
+                        if job in self.cancelled:
+                            raise ParseCancelled()
+                        self.jobs.get(owner, set()).discard(job)
+                        pool, job = self.submit(html, url, backend, owner)
+                    deadline = time.monotonic() + self.timeout
+                    continue
+                if time.monotonic() > deadline:
+                    self.restart(pool)
+                    raise TimeoutError('Page took too long to parse')
+            return job.get()
+        finally:
+            with self.lock:
+                self.jobs.get(owner, set()).discard(job)
+                self.cancelled.discard(job)
+
+    def submit(self, html, url, backend, owner):
+        """Queue a parse on the current pool (call with the lock held)"""
+        job = self.pool.apply_async(distill, (html, url, backend))
+        self.jobs.setdefault(owner, set()).add(job)
+        return self.pool, job
+
+    def cancel(self, owner):
+        """Stop waiting on owner's parses"""
+        with self.lock:
+            self.cancelled.update(self.jobs.pop(owner, ()))
+
+    def restart(self, pool):
+        """Kill a stuck pool (unless someone already replaced it)"""
+        with self.lock:
+            if pool is not self.pool:
+                return
+            self.pool = self.start_pool()
+            self.restarts += 1
+        pool.terminate()
+
+    def summary(self):
+        return (f"Parse pool: {self.offloaded} pages in workers, "
+                f"{self.inline} inline, {self.restarts} restarts")
+
+    def close(self):
+        self.pool.terminate()
@@ -0,0 +1,44 @@
+"""Finding the Game.com's serial adapter by USB vendor/product ID
+
+    python ports.py        # list serial ports with their USB IDs
+
+USB adapters don't keep their device name: /dev/ttyUSB0 can come back
+as /dev/ttyUSB1 after a replug, and macOS/Windows names vary. Matching
+on VID:PID finds the cable wherever it lands.
+"""
+
+# USB-serial bridges found in Game.com link cable setups, best first
+KNOWN_ADAPTERS = [
+    (0x0403, 0x6001),  # FTDI FT232R
+    (0x0403, 0x6015),  # FTDI FT-X
+    (0x067b, 0x2303),  # Prolific PL2303
+    (0x10c4, 0xea60),  # Silicon Labs CP210x
+    (0x1a86, 0x7523),  # WCH CH340
+]
+
+
+def parse_usb_id(text):
+    """(vid, pid) from 'VID:PID' in hex, e.g. '0403:6001'"""
+    vid, sep, pid = text.partition(':')
+    if not sep:
+        raise ValueError(f'USB ID {text!r} is not VID:PID')
+    return int(vid, 16), int(pid, 16)
+
+
+def find_port(usb_ids=KNOWN_ADAPTERS):
+    """Device of the first attached adapter matching usb_ids, or None"""
+    # Not needed unless we go looking, so not imported at startup
+    from serial.tools import list_ports
+    ports = [info for info in list_ports.comports() if info.vid is not None]
+    for vid, pid in usb_ids:
+        for info in ports:
+            if (info.vid, info.pid) == (vid, pid):
+                return info.device
+    return None
+
+
+if __name__ == '__main__':
+    from serial.tools import list_ports
+    for info in list_ports.comports():
+        usb = f'{info.vid:04x}:{info.pid:04x}' if info.vid is not None else '-'
+        print(f'{info.device:<24}{usb:<12}{info.description}')
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from httpcache import normalize_url
+
+
+class Prefetcher:
+    """Warm the caches with the links a user is likely to pick next
+
+    load(url) must fetch and distill the page into the shared caches and
+    return the number of bytes downloaded. Each owner (one per session)
+    has its own batch of URLs; scheduling a new batch or calling cancel()
+    drops whatever of the old batch hasn't started. Downloads stop once a
+    batch has used up its byte_budget, or once all owners together have
+    fetched total_budget bytes in the last budget_window seconds.
+    """
+
+    def __init__(self, load, top_n=3, workers=3, per_host=2,
+                 byte_budget=1024 * 1024, total_budget=8 * 1024 * 1024,
+                 budget_window=60.0):
+        self.load = load
+        self.top_n = top_n
+        self.per_host = per_host
+        self.byte_budget = byte_budget
+        self.total_budget = total_budget
+        self.budget_window = budget_window
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='prefetch')
+        self.lock = threading.Lock()
+        self.host_slots = {}
+        # Per owner: {url key: future}, bytes spent, and a batch counter
+        # that lets queued work notice it has been superseded
+        self.batches = {}
+        self.spent = {}
+        self.generation = {}
+        # Per owner: the URL key the user picked, which runs even though
+        # its batch has been cancelled
+        self.claimed = {}
+        self.requests = 0
+        self.hits = 0
+        self.fetched = 0
+        self.bytes = 0
+        self.skipped = 0
+
+    def schedule(self, owner, urls):
+        """Replace owner's batch with the first top_n of urls"""
+        self.cancel(owner)
+        with self.lock:
+            generation = self.generation.get(owner, 0) + 1
+            self.generation[owner] = generation
+            self.spent[owner] = 0
+            batch = {}
+            for url in urls[:self.top_n]:
+                key = normalize_url(url)
+                if key not in batch:
+                    batch[key] = self.pool.submit(self.run, owner, generation, url)
+            self.batches[owner] = batch
+
+    def cancel(self, owner):
+        """Drop owner's pending prefetches (ones already running finish)"""
+        with self.lock:
+            batch = self.batches.pop(owner, {})
+            self.generation[owner] = self.generation.get(owner, 0) + 1
+        for future in batch.values():
+            future.cancel()
+
+    def claim(self, owner, url):
+        """The user picked url: drop the rest of the batch, and wait for url
+        if its prefetch has already started
+
+        Returns True if url was (or finished being) prefetched. Counts
+        towards the hit rate either way.
+        """
+        key = normalize_url(url)
+        with self.lock:
+            self.requests += 1
+            future = self.batches.get(owner, {}).pop(key, None)
+            if future is not None:
+                self.claimed[owner] = key
+        self.cancel(owner)
+        if future is None:
+            return False
+        if future.cancel():
+            # Still queued: the caller fetching it now beats waiting for a worker
+            with self.lock:
+                self.claimed.pop(owner, None)
+            return False
+        try:
+            hit = future.result() is not None
+        except Exception:
+            hit = False
+        finally:
+            with self.lock:
+                if self.claimed.get(owner) == key:
+                    del self.claimed[owner]
+        if hit:
+            with self.lock:
+                self.hits += 1
+        return hit
+
+    def slot(self, url):
+        host = urlsplit(url).hostname or ''
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_slots[host]
+
+    def run(self, owner, generation, url):
+        """Worker: load url unless the batch was cancelled or is over budget"""
+        key = normalize_url(url)
+        with self.slot(url):
+            with self.lock:
+                if (self.generation.get(owner) != generation and
+                        self.claimed.get(owner) != key):
+                    return None
+                if (self.spent.get(owner, 0) >= self.byte_budget or
+                        self.over_total_budget()):
+                    self.skipped += 1
+                    return None
+            nbytes = self.load(url)
+            with self.lock:
+                self.spent[owner] = self.spent.get(owner, 0) + nbytes
+                self.window_bytes += nbytes
+                self.fetched += 1
+                self.bytes += nbytes
+            return nbytes
+
+    def over_total_budget(self):
+        """True if this window's total_budget is spent (call with lock held)"""
+        now = time.monotonic()
+        if now - self.window_start >= self.budget_window:
+            self.window_start = now
+            self.window_bytes = 0
+        return self.window_bytes >= self.total_budget
+
+    def summary(self):
+        rate = 100.0 * self.hits / self.requests if self.requests else 0.0
+        return (f"Prefetch: {self.fetched} pages ({self.bytes} bytes), "
+                f"{self.hits}/{self.requests} picks prefetched ({rate:.0f}%), "
+                f"{self.skipped} skipped over budget")
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import metrics
+
+
+class ProgressiveLoad:
+    """A page loading on a worker thread, shown before it has all arrived
+
+    The loader reports previews (title, paragraphs and links seen so far)
+    while the document streams in. ready is set as soon as one of them
+    fills a screen, or when the load ends; done once the whole page is in
+    (page) or the load has failed (error).
+    """
+
+    def __init__(self, url, min_chars):
+        self.url = url
+        # Paragraph text needed to fill the first screen
+        self.min_chars = min_chars
+        self.preview = None
+        self.page = None
+        self.error = None
+        self.ready = threading.Event()
+        self.done = threading.Event()
+        self.started = time.perf_counter()
+
+    def start(self, load):
+        """Run load(url, on_progress) on a daemon thread"""
+        threading.Thread(target=self.run, args=(load,), daemon=True,
+                         name='page-loader').start()
+        return self
+
+    def run(self, load):
+        try:
+            self.page = metrics.profiler.call(load, self.url, self.progress)
+        except Exception as e:
+            self.error = e
+        self.done.set()
+        self.set_ready()
+
+    def progress(self, preview):
+        """Loader callback; True once preview is enough for the first screen"""
+        if sum(len(text) for text in preview['content']) < self.min_chars:
+            return False
+        self.preview = preview
+        self.set_ready()
+        return True
+
+    def set_ready(self):
+        if not self.ready.is_set():
+            metrics.observe('fetch.first_screen', time.perf_counter() - self.started)
+            self.ready.set()
+
+    def wait_ready(self):
+        self.ready.wait()
+        return self
+
+    def wait_done(self):
+        self.done.wait()
+        return self
@@ -0,0 +1,147 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+
+WORD = re.compile(r'\w+')
+
+
+def match_query(text, any_word=False):
+    """FTS5 query for what the user typed: every word, last one as a prefix
+
+    Words are quoted, so nothing the user types is taken as query syntax.
+    Returns None if text has no words.
+    """
+    words = WORD.findall(text.lower())[:8]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    # Finding "retro gam" as you type beats insisting on whole words
+    terms[-1] += '*'
+    return (' OR ' if any_word else ' ').join(terms)
+
+
+class SearchIndex:
+    """Full-text index of the pages people have read (or prefetched)
+
+    An SQLite FTS5 table: an inverted index kept on disk (or in memory
+    with path=None), ranked with BM25, title matches counting four times
+    as much as body text. Pages are added from a background thread so
+    indexing never holds up a screen. Each URL is indexed once (the
+    latest copy wins); past max_pages or max_bytes the oldest pages are
+    dropped.
+    """
+
+    def __init__(self, path=None, max_pages=20000, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            if path:
+                self.db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                self.db.execute('PRAGMA journal_mode = WAL')
+            # docs maps each URL to its row in pages; lower ids are older
+            self.db.execute('CREATE TABLE IF NOT EXISTS docs '
+                            '(id INTEGER PRIMARY KEY, url TEXT UNIQUE)')
+            self.db.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5('
+                'url UNINDEXED, title, body, tokenize="porter unicode61")')
+            self.db.commit()
+            self.count = self.db.execute('SELECT count(*) FROM docs').fetchone()[0]
+        self.queue = queue.Queue()
+        self.searches = 0
+        threading.Thread(target=self.run, daemon=True, name='search-index').start()
+
+    def add(self, page):
+        """Index a distilled page (returns at once; indexing is queued)"""
+        if page.get('content') or page.get('title'):
+            self.queue.put(page)
+
+    def run(self):
+        while True:
+            pages = [self.queue.get()]
+            # Index whatever else has queued up in the same transaction
+            while len(pages) < 100:
+                try:
+                    pages.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.index(pages)
+            except sqlite3.Error as e:
+                print(f"Search index: {e}")
+
+    def index(self, pages):
+        with self.lock:
+            for page in pages:
+                old = self.db.execute('SELECT id FROM docs WHERE url = ?',
+                                      (page['url'],)).fetchone()
+                if old:
+                    self.db.execute('DELETE FROM pages WHERE rowid = ?', old)
+                    self.db.execute('DELETE FROM docs WHERE id = ?', old)
+                    self.count -= 1
+                doc_id = self.db.execute('INSERT INTO docs (url) VALUES (?)',
+                                         (page['url'],)).lastrowid
+                self.db.execute(
+                    'INSERT INTO pages (rowid, url, title, body) VALUES (?, ?, ?, ?)',
+                    (doc_id, page['url'], page['title'], '\n'.join(page['content'])))
+                self.count += 1
+            self.trim()
+            self.db.commit()
+
+    def trim(self):
+        """Drop the oldest pages while over max_pages or max_bytes"""
+        excess = self.count - self.max_pages
+        if self.path and self.size() > self.max_bytes:
+            excess = max(excess, self.count // 10)
+        if excess <= 0:
+            return
+        oldest = self.db.execute('SELECT id FROM docs ORDER BY id LIMIT 1 OFFSET ?',
+                                 (excess - 1,)).fetchone()[0]
+        self.db.execute('DELETE FROM pages WHERE rowid <= ?', (oldest,))
+        self.db.execute('DELETE FROM docs WHERE id <= ?', (oldest,))
+        self.count -= excess
+        self.db.execute("INSERT INTO pages (pages) VALUES ('optimize')")
+        if self.path:
+            self.db.execute('PRAGMA incremental_vacuum')
+
+    def size(self):
+        """Bytes the index takes on disk"""
+        try:
+            return sum(os.path.getsize(self.path + suffix)
+                       for suffix in ('', '-wal') if os.path.exists(self.path + suffix))
+        except OSError:
+            return 0
+
+    def search(self, text, limit=50):
+        """Best matches for text as [{'url', 'text'}], best first
+
+        Pages with every word come first; if there are none, pages with
+        any of them.
+        """
+        self.searches += 1
+        for any_word in (False, True):
+            query = match_query(text, any_word)
+            if query is None:
+                return []
+            with self.lock:
+                rows = self.db.execute(
+                    'SELECT url, title FROM pages WHERE pages MATCH ? '
+                    'ORDER BY bm25(pages, 0.0, 4.0, 1.0) LIMIT ?',
+                    (query, limit)).fetchall()
+            if rows:
+                return [{'url': url, 'text': (title or url)[:40]}
+                        for url, title in rows]
+        return []
+
+    def summary(self):
+        return (f"Search index: {self.count} pages, {self.searches} searches"
+                + (f", {self.size()} bytes on disk" if self.path else ""))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,63 @@
+from history import History
+
+
+class Session:
+    """Browsing state for one connected Game.com
+
+    Kept separate from the gateway (which owns the serial port and shared
+    services) so many sessions can be served from one process. __slots__
+    keeps each one to a few hundred bytes.
+    """
+
+    __slots__ = (
+        'connected',
+        'buffer',
+        'user_buffer',
+        'current_menu',
+        'hn_stories',
+        'hn_links',
+        'reddit_posts',
+        'reddit_titles',
+        'awaiting_url',
+        'awaiting_search',
+        'search_results',
+        'current_links',
+        'current_content',
+        'current_url',
+        'current_title',
+        'current_partial',
+        'history',
+        'page',
+        'viewing_links',
+        'loading',
+    )
+
+    def __init__(self):
+        self.connected = False
+        self.buffer = ""
+        self.user_buffer = ""
+        self.current_menu = "main"
+        self.hn_stories = []
+        self.hn_links = []
+        self.reddit_posts = []
+        self.reddit_titles = []
+        self.awaiting_url = False
+        self.awaiting_search = False
+        self.search_results = []
+        self.current_links = []
+        self.current_content = []
+        self.current_url = ""
+        self.current_title = ""
+        # The page being read is only the first screens of one
+        self.current_partial = False
+        self.history = History()
+        self.page = 0
+        self.viewing_links = False
+        # ProgressiveLoad still filling in the page being read, if any
+        self.loading = None
+
+
+def session_property(name):
+    """Gateway attribute that reads and writes through to its Session"""
+    return property(lambda self: getattr(self.session, name),
+                    lambda self, value: setattr(self.session, name, value))
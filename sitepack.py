@@ -0,0 +1,244 @@
+"""Offline site packs: distilled pages in one memory-mapped file
+
+Build one with
+
+    python sitepack.py demo.pack --feeds --seed example.com --depth 1
+
+and serve it with browser.py --pack demo.pack.
+
+Layout: a header, then one zlib record per page (pagecache.pack_page) or
+feed listing, then a sorted index of fixed-size entries (16-byte blake2b
+of the key, offset, length), then a footer pointing at the index. A
+lookup is a binary search over the mmapped index plus one decompress, so
+opening a pack costs the same whatever its size.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from httpcache import HttpCache, normalize_url
+from pagecache import pack_page, unpack_page
+
+
+MAGIC = b'GCPACK1\n'
+FOOTER = struct.Struct('<QI8s')      # index offset, entry count, magic
+ENTRY = struct.Struct('<16sQI')      # key digest, record offset, length
+FOOTER_MAGIC = b'GCPKIDX1'
+
+
+def key_digest(key):
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+def page_key(url):
+    return 'page:' + normalize_url(url)
+
+
+def feed_key(name):
+    return 'feed:' + name
+
+
+class PackWriter:
+    """Writes a pack; entries become visible when close() adds the index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp = path + '.tmp'
+        self.f = open(self.tmp, 'wb')
+        self.f.write(MAGIC)
+        self.entries = {}
+
+    def add(self, key, data):
+        """Store compressed record data under key (first one wins)"""
+        digest = key_digest(key)
+        if digest in self.entries:
+            return
+        self.entries[digest] = (self.f.tell(), len(data))
+        self.f.write(data)
+
+    def add_page(self, url, page):
+        data = pack_page(page)
+        self.add(page_key(url), data)
+        # Redirected pages are found under both URLs
+        self.add(page_key(page['url']), data)
+
+    def add_feed(self, name, titles, links):
+        data = zlib.compress(json.dumps([titles, links]).encode('utf-8'))
+        self.add(feed_key(name), data)
+
+    def close(self):
+        index_offset = self.f.tell()
+        for digest in sorted(self.entries):
+            offset, length = self.entries[digest]
+            self.f.write(ENTRY.pack(digest, offset, length))
+        self.f.write(FOOTER.pack(index_offset, len(self.entries), FOOTER_MAGIC))
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+
+class SitePack:
+    """Read-only view of a pack; records are read straight from the mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC or len(self.mm) < len(MAGIC) + FOOTER.size:
+            raise ValueError(f'{path} is not a site pack')
+        self.index_offset, self.count, magic = FOOTER.unpack_from(
+            self.mm, len(self.mm) - FOOTER.size)
+        if magic != FOOTER_MAGIC:
+            raise ValueError(f'{path} is not a site pack')
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, key):
+        """Record bytes for key, or None"""
+        digest = key_digest(key)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = self.index_offset + mid * ENTRY.size
+            found = self.mm[pos:pos + 16]
+            if found < digest:
+                lo = mid + 1
+            elif found > digest:
+                hi = mid
+            else:
+                _, offset, length = ENTRY.unpack_from(self.mm, pos)
+                return self.mm[offset:offset + length]
+        return None
+
+    def get(self, url):
+        """Distilled page for url (http and https count as one), or None"""
+        data = self.find(page_key(url))
+        if data is None:
+            if url.startswith('http://'):
+                data = self.find(page_key('https://' + url[7:]))
+            elif url.startswith('https://'):
+                data = self.find(page_key('http://' + url[8:]))
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return unpack_page(data)
+
+    def feed(self, name):
+        """(titles, links) of a feed as it was when packed, or None"""
+        data = self.find(feed_key(name))
+        if data is None:
+            return None
+        titles, links = json.loads(zlib.decompress(data))
+        return titles, links
+
+    def summary(self):
+        return (f"Site pack {os.path.basename(self.path)}: {self.count} entries, "
+                f"{self.hits} pages served, {self.misses} not packed")
+
+    def close(self):
+        self.mm.close()
+
+
+# -- building -----------------------------------------------------------------
+
+def crawl(writer, gateway, seeds, depth=1, max_pages=200, workers=8):
+    """Breadth-first crawl from seeds, following each page's links
+
+    Pages are downloaded and distilled exactly as fetch_url would.
+    Returns the number of pages packed.
+    """
+    queued = set()
+    frontier = deque()
+    for url in seeds:
+        valid, url = gateway.validate_url(url)
+        if valid and url not in queued:
+            queued.add(url)
+            frontier.append((url, 0))
+
+    packed = 0
+    with ThreadPoolExecutor(workers) as pool:
+        while frontier and packed < max_pages:
+            batch = []
+            while frontier and len(batch) < max_pages - packed:
+                batch.append(frontier.popleft())
+            jobs = [(url, level, pool.submit(gateway.load_page, url))
+                    for url, level in batch]
+            for url, level, job in jobs:
+                try:
+                    page = job.result()
+                except Exception as e:
+                    print(f"  skipped {url}: {str(e)[:60]}")
+                    continue
+                writer.add_page(url, page)
+                packed += 1
+                print(f"  [{packed}] {url}")
+                if level >= depth:
+                    continue
+                for link in page['links']:
+                    if link['url'].startswith(('http://', 'https://')) and \
+                            link['url'] not in queued:
+                        queued.add(link['url'])
+                        frontier.append((link['url'], level + 1))
+    return packed
+
+
+def build(path, seeds=(), feeds=False, depth=1, max_pages=200, parser='auto'):
+    """Crawl seeds (and the HN/Reddit listings if feeds) into a pack"""
+    from browser import GameComGateway
+
+    class Offline:
+        """Enough of a serial port to borrow the gateway's fetch path"""
+        def write(self, data):
+            pass
+
+        def flush(self):
+            pass
+
+    http = HttpCache()
+    gateway = GameComGateway(ser=Offline(), http=http, parser=parser)
+    writer = PackWriter(path)
+    seeds = list(seeds)
+    start = time.time()
+    if feeds:
+        for name, feed in gateway.feeds.feeds.items():
+            try:
+                titles, links = gateway.load_feed(name)
+            except Exception as e:
+                print(f"Feed {name} failed: {str(e)[:60]}")
+                continue
+            base = getattr(feed, 'base', None) or getattr(feed, 'url', '')
+            links = [urljoin(base, link) for link in links]
+            writer.add_feed(name, titles, links)
+            seeds.extend(links)
+            print(f"Feed {name}: {len(titles)} items")
+    packed = crawl(writer, gateway, seeds, depth, max_pages)
+    writer.close()
+    print(f"Packed {packed} pages into {path} "
+          f"({os.path.getsize(path)} bytes, {time.time() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build an offline site pack')
+    parser.add_argument('path', help='pack file to write')
+    parser.add_argument('--seed', action='append', default=[],
+                        help='URL to start from (repeatable)')
+    parser.add_argument('--feeds', action='store_true',
+                        help='pack the HN and Reddit listings and crawl their links')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='links to follow away from a seed')
+    parser.add_argument('--max-pages', type=int, default=200)
+    parser.add_argument('--parser', default='auto',
+                        choices=['auto', 'lxml', 'html.parser', 'bs4'])
+    args = parser.parse_args()
+    if not args.seed and not args.feeds:
+        parser.error('nothing to pack: give --seed URL and/or --feeds')
+    build(args.path, args.seed, args.feeds, args.depth, args.max_pages, args.parser)
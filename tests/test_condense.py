@@ -0,0 +1,51 @@
+from condense import CUT_NOTE, Condenser
+
+
+def page(path, *content):
+    return {'url': f'https://news.example{path}', 'title': 'News',
+            'content': list(content), 'links': []}
+
+
+def article(n):
+    return f'Story number {"one two three four five".split()[n]} ' * 8
+
+
+def test_repeat_within_a_page_is_sent_once():
+    condensed, report = Condenser().condense(
+        page('/a', 'Hello  there !', 'Hello there!', 'Bye.....'))
+    assert condensed['content'] == ['Hello there!', 'Bye...']
+    assert report.repeats == 1
+
+
+def test_furniture_is_dropped_once_on_min_pages():
+    condenser = Condenser(min_pages=3)
+    shown = []
+    for n in range(4):
+        condensed, report = condenser.condense(
+            page(f'/story{n}', article(n), f'Updated {n + 2} hours ago'))
+        shown.append(condensed['content'])
+    assert shown[0] == [article(0).strip(), 'Updated 2 hours ago']
+    assert shown[1] == [article(1).strip(), 'Updated 3 hours ago']
+    assert shown[2] == [article(2).strip()]
+    assert shown[3] == [article(3).strip()]
+    assert report.boilerplate == 1
+
+
+def test_paragraphs_without_letters_are_kept():
+    condenser = Condenser(min_pages=2)
+    for n in range(3):
+        condensed, report = condenser.condense(
+            page(f'/scores{n}', article(n), '2 - 1', '3 - 0', '$5', '$10'))
+        assert condensed['content'][1:] == ['2 - 1', '3 - 0', '$5', '$10']
+        assert report.boilerplate == report.repeats == 0
+
+
+def test_fit_cuts_to_max_bytes_at_a_word_break():
+    condenser = Condenser(max_bytes=100)
+    content, cut = condenser.fit(['a' * 30, 'word ' * 20, 'last'])
+    assert content[0] == 'a' * 30
+    assert content[1].endswith(' ...') and content[1].startswith('word')
+    assert content[-1] == CUT_NOTE
+    assert sum(len(text) for text in content) <= 100
+    assert cut == 134 - sum(len(text) for text in content)
+    assert condenser.fit(['short']) == (['short'], 0)
@@ -0,0 +1,36 @@
+import codecs
+
+from encoding import sniff_encoding, to_ascii
+
+
+def test_byte_order_mark_wins_over_the_header():
+    head = codecs.BOM_UTF8 + b'<meta charset="iso-8859-2">'
+    assert sniff_encoding(head, 'text/html; charset=latin-1') == 'utf-8-sig'
+
+
+def test_header_wins_over_meta():
+    head = b'<meta charset="iso-8859-2">'
+    assert sniff_encoding(head, 'text/html; charset=utf-8') == 'utf-8'
+    assert sniff_encoding(head, 'text/html') == 'iso8859-2'
+
+
+def test_latin_1_is_read_as_windows_1252():
+    assert sniff_encoding(b'<p>', 'text/html; charset=ISO-8859-1') == 'cp1252'
+    assert sniff_encoding(b'<meta charset=latin1>') == 'cp1252'
+    assert '\x93quoted\x94'.encode('latin-1').decode(
+        sniff_encoding(b'', 'charset=latin-1')) == '“quoted”'
+
+
+def test_unlabeled_page_is_utf_8():
+    assert sniff_encoding(b'<html>', 'text/html') == 'utf-8'
+    assert sniff_encoding(b'<meta charset="utf-16">') == 'utf-8'
+
+
+def test_to_ascii_spells_what_it_can():
+    assert to_ascii('“Caf\xe9” — na\xefve') == '"Cafe" -- naive'
+    assert to_ascii('Москва') == 'Moskva'
+
+
+def test_each_run_of_emoji_becomes_one_question_mark():
+    assert to_ascii('Nice \U0001f44d\U0001f44d\U0001f389 job') == 'Nice ? job'
+    assert to_ascii('\U0001f600\U0001f600 日本') == '? ?'
@@ -0,0 +1,62 @@
+import os
+import threading
+
+from httpcache import CachedResponse, DiskCache, HttpCache, normalize_url
+
+
+class FakeResponse:
+    def __init__(self, url, body=b'<p>hello</p>'):
+        self.url = url
+        self.status_code = 200
+        self.headers = {'content-type': 'text/html; charset=utf-8'}
+        self.content = body
+        self.encoding = None
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8')
+
+    def close(self):
+        pass
+
+
+class FakeHttp:
+    def get(self, url, headers=None, stream=False, **kwargs):
+        return FakeResponse(url)
+
+
+def entry(n, size=400):
+    return CachedResponse(f'http://example.com/{n}', 200, 'x' * size, {}, size)
+
+
+def test_unwritable_disk_is_a_miss_not_an_error(tmp_path):
+    cache = HttpCache(http=FakeHttp(), disk_dir=str(tmp_path))
+    key = normalize_url('http://example.com/page')
+    # Writing the temp file fails, as it would on a full disk
+    os.mkdir(cache.disk.filename(key) + '.tmp')
+    resp = cache.get('http://example.com/page')
+    assert resp.text == '<p>hello</p>'
+    assert cache.disk.errors == 1
+    assert cache.disk.get(key) is None
+
+
+def test_concurrent_writes_and_eviction(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=8 * 1024)
+    errors = []
+
+    def writer(start):
+        try:
+            for n in range(start, start + 50):
+                disk.put(f'http://example.com/{n % 30}', entry(n))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i * 50,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    on_disk = sum(e.stat().st_size for e in os.scandir(tmp_path))
+    assert disk.size == on_disk <= disk.max_bytes
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
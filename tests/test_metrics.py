@@ -0,0 +1,46 @@
+import cProfile
+import threading
+
+from metrics import Profiler
+
+
+class OneActiveProfile(cProfile.Profile):
+    """cProfile as on Python 3.12+: one enabled profile per process"""
+
+    active = None
+
+    def enable(self, *args, **kwargs):
+        if OneActiveProfile.active not in (None, self):
+            raise ValueError('Another profiling tool is already active')
+        OneActiveProfile.active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        OneActiveProfile.active = None
+
+
+def test_second_thread_runs_unprofiled_when_profile_is_taken(monkeypatch):
+    monkeypatch.setattr(cProfile, 'Profile', OneActiveProfile)
+    profiler = Profiler()
+    profiler.start()
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        entered.set()
+        release.wait(5)
+        return 'held'
+
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(profiler.call(hold)))
+    thread.start()
+    entered.wait(5)
+    assert profiler.call(lambda x: x * 2, 21) == 42
+    release.set()
+    thread.join(5)
+    assert results == ['held']
+    assert profiler.missed == 1
+    report = profiler.stop()
+    assert report.startswith('1 calls not profiled')
+    assert 'hold' in report
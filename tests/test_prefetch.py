@@ -0,0 +1,52 @@
+import time
+
+from prefetch import Prefetcher
+
+
+def slow_load(seconds, nbytes=1000):
+    loaded = []
+
+    def load(url):
+        time.sleep(seconds)
+        loaded.append(url)
+        return nbytes
+    return load, loaded
+
+
+def urls(n):
+    return [f'http://site{i}.example/' for i in range(n)]
+
+
+def test_claiming_a_queued_url_returns_at_once():
+    load, loaded = slow_load(0.5)
+    prefetcher = Prefetcher(load, top_n=6, workers=3)
+    prefetcher.schedule('owner', urls(6))
+    start = time.monotonic()
+    assert prefetcher.claim('owner', urls(6)[5]) is False
+    assert time.monotonic() - start < 0.1
+    prefetcher.shutdown()
+
+
+def test_claiming_a_running_url_waits_for_it():
+    load, loaded = slow_load(0.2)
+    prefetcher = Prefetcher(load, top_n=3, workers=3)
+    prefetcher.schedule('owner', urls(3))
+    time.sleep(0.05)
+    assert prefetcher.claim('owner', urls(3)[0]) is True
+    assert urls(3)[0] in loaded
+    prefetcher.shutdown()
+
+
+def test_total_budget_is_shared_by_all_owners():
+    load, loaded = slow_load(0, nbytes=600)
+    prefetcher = Prefetcher(load, top_n=1, workers=1, total_budget=1000)
+    done = []
+    for owner in range(4):
+        prefetcher.schedule(owner, urls(4)[owner:])
+        done.append(prefetcher.batches[owner])
+    for batch in done:
+        for future in batch.values():
+            future.result()
+    assert len(loaded) == 2
+    assert prefetcher.skipped == 2
+    prefetcher.shutdown()
@@ -0,0 +1,46 @@
+import errno
+
+import pytest
+import serial
+
+from browser import GameComGateway
+from transport import FrameWriter
+
+termios = pytest.importorskip('termios')
+
+
+class FakePort:
+    """Takes writes; flush() (tcdrain) fails with drain_errno if set"""
+
+    def __init__(self, drain_errno=None):
+        self.drain_errno = drain_errno
+        self.written = bytearray()
+
+    def write(self, data):
+        self.written += data
+        return len(data)
+
+    def flush(self):
+        if self.drain_errno is not None:
+            raise termios.error(self.drain_errno, 'drain failed')
+
+
+def test_port_that_cannot_drain_is_paced_by_airtime():
+    port = FakePort(errno.ENOTTY)
+    out = FrameWriter(port, baudrate=115200)
+    out.write(b'OK\r\n')
+    assert out.flush() == 4
+    assert port.written == b'OK\r\n'
+
+
+def test_unplugged_port_raises_serial_exception():
+    out = FrameWriter(FakePort(errno.EIO), baudrate=115200)
+    out.write(b'OK\r\n')
+    with pytest.raises(serial.SerialException):
+        out.flush()
+
+
+def test_dispatch_survives_port_lost_mid_reply(capsys):
+    gateway = GameComGateway(ser=FakePort(errno.EIO), baudrate=115200)
+    gateway.dispatch('at', 'ATZ')
+    assert 'Output lost' in capsys.readouterr().out
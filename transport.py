@@ -0,0 +1,264 @@
+import errno
+import re
+import threading
+import time
+
+import serial
+
+try:
+    import termios
+    # What pyserial's flush() (tcdrain) raises on POSIX
+    DRAIN_ERROR = termios.error
+except ImportError:
+    # Windows: flush() raises SerialException itself
+    DRAIN_ERROR = ()
+
+
+XON = 0x11
+XOFF = 0x13
+FLOW_CONTROL = ('none', 'rtscts', 'xonxoff')
+
+# Top line rate for the modulations a dial-up stack can ask for with AT+MS
+MODULATION_RATES = {
+    'v21': 300, 'b103': 300, 'bell103': 300,
+    'v22': 1200, 'v23': 1200, 'b212': 1200, 'bell212': 1200,
+    'v22b': 2400, 'v22bis': 2400,
+    'v32': 9600, 'v32b': 14400, 'v32bis': 14400,
+    'v34': 33600, 'v90': 56000, 'v92': 56000,
+}
+
+
+def requested_rate(cmd):
+    """Line rate asked for by an AT+MS=<mod>,<auto>,<min>,<max> command
+
+    Returns None if cmd doesn't ask for one.
+    """
+    match = re.match(r'at\+ms=(.*)', cmd.lower().replace(' ', ''))
+    if not match:
+        return None
+    fields = match.group(1).split(',')
+    # max_rate is the 4th field; fall back to the modulation's top rate
+    if len(fields) >= 4 and fields[3].isdigit():
+        return int(fields[3])
+    mod = fields[0]
+    if mod.isdigit():
+        return int(mod)
+    return MODULATION_RATES.get(mod)
+
+
+class FrameWriter:
+    """Buffer a whole screen of output and send it to the Game.com in one write
+
+    Output is paced to the link rate. With flow control ('rtscts' or
+    'xonxoff') the writer holds off between chunks while the device
+    deasserts CTS or has sent XOFF. Each such stall
+    lowers the pacing rate a notch; runs of frames without stalls raise
+    it back towards the line rate, so output settles at the fastest rate
+    the device keeps up with. Without flow control there is nothing to
+    adapt to and output is simply paced at the line rate.
+
+    XON/XOFF are handled here rather than by the OS so stalls can be
+    counted: whoever reads the port passes input through filter_input(),
+    which strips them and pauses/resumes the writer.
+
+    Frames are written chunk_size bytes at a time, so at most one chunk
+    sits in the port's buffer and echo() can get a keystroke onto the
+    wire within one chunk's airtime, even while a long frame is going out.
+    """
+
+    def __init__(self, ser, baudrate=9600, bits_per_byte=10, flow='none',
+                 chunk_size=32, settle=0.5, stall_timeout=5.0):
+        if flow not in FLOW_CONTROL:
+            raise ValueError(f'Unknown flow control {flow!r}')
+        self.ser = ser
+        # Rate of the serial port; the connection can't go faster
+        self.line_rate = baudrate
+        # Rate the link was brought up at, and the (adaptive) pacing rate
+        self.link_rate = baudrate
+        self.baudrate = baudrate
+        # 8N1 framing: start bit + 8 data bits + stop bit
+        self.bits_per_byte = bits_per_byte
+        self.flow = flow
+        self.chunk_size = chunk_size
+        self.settle = settle
+        self.stall_timeout = stall_timeout
+        self.pending = bytearray()
+        self.paused = False
+        # Serializes echo() and frame writes from different threads
+        self.lock = threading.Lock()
+        self.echoed = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.seconds_sent = 0.0
+        self.last_bytes = 0
+        self.last_seconds = 0.0
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.clean_frames = 0
+
+    def write(self, data):
+        """Queue bytes for the next flush"""
+        self.pending += data
+
+    def airtime(self, nbytes):
+        """Seconds the link needs to clock out nbytes"""
+        return nbytes * self.bits_per_byte / float(self.baudrate)
+
+    def take(self):
+        """Return and clear the pending buffer"""
+        data = bytes(self.pending)
+        self.pending.clear()
+        return data
+
+    # -- link rate ----------------------------------------------------------
+
+    def set_link_rate(self, rate):
+        """Bring the link up at rate (capped at the port's rate); returns it"""
+        self.link_rate = min(rate or self.line_rate, self.line_rate)
+        self.baudrate = self.link_rate
+        self.clean_frames = 0
+        return self.link_rate
+
+    def settle_time(self):
+        """How long to give the device after CONNECT before sending
+
+        With flow control the device says itself when it is ready.
+        """
+        return 0.0 if self.flow != 'none' else self.settle
+
+    def adapt(self, stalled):
+        """AIMD: back off on a stall, creep back up after clean frames"""
+        if stalled:
+            self.baudrate = max(self.link_rate / 8.0, self.baudrate * 0.75)
+            self.clean_frames = 0
+        elif self.baudrate < self.link_rate:
+            self.clean_frames += 1
+            if self.clean_frames >= 4:
+                self.baudrate = min(self.link_rate,
+                                    self.baudrate + self.link_rate / 16.0)
+                self.clean_frames = 0
+
+    # -- flow control -------------------------------------------------------
+
+    def filter_input(self, data):
+        """Strip XON/XOFF from data read from the port (xonxoff only)"""
+        if self.flow != 'xonxoff' or not (XON in data or XOFF in data):
+            return data
+        out = bytearray()
+        for byte in data:
+            if byte == XOFF:
+                self.paused = True
+            elif byte == XON:
+                self.paused = False
+            else:
+                out.append(byte)
+        return bytes(out)
+
+    def blocked(self):
+        """True while the device has asked us to stop sending"""
+        if self.flow == 'xonxoff':
+            return self.paused
+        if self.flow == 'rtscts':
+            try:
+                return not self.ser.cts
+            except (OSError, AttributeError):
+                # No modem status lines (PTYs)
+                return False
+        return False
+
+    def chunks(self, data):
+        """Pieces to write between flow control checks and echoes"""
+        size = self.chunk_size
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def wait_clear(self):
+        """Block until the device lets us send; returns seconds waited"""
+        if not self.blocked():
+            return 0.0
+        start = time.monotonic()
+        while self.blocked():
+            if time.monotonic() - start > self.stall_timeout:
+                # Lost XON or a miswired CTS line; don't hang forever
+                self.paused = False
+                break
+            time.sleep(0.005)
+        return time.monotonic() - start
+
+    # -- sending ------------------------------------------------------------
+
+    def flush(self):
+        """Write pending output and wait for it to leave the port
+
+        Returns the number of bytes written (0 if nothing was pending).
+        """
+        if not self.pending:
+            return 0
+
+        data = self.take()
+        start = time.monotonic()
+        stalled = 0.0
+        for chunk in self.chunks(data):
+            stalled += self.wait_clear()
+            sent_at = time.monotonic()
+            with self.lock:
+                self.ser.write(chunk)
+            self.drain()
+
+            # PTYs and some USB adapters return from drain immediately, so
+            # make sure we never queue faster than the pacing rate
+            remaining = self.airtime(len(chunk)) - (time.monotonic() - sent_at)
+            if remaining > 0:
+                time.sleep(remaining)
+
+        self.record(len(data), time.monotonic() - start, stalled)
+        return len(data)
+
+    def drain(self):
+        """tcdrain(): block until the UART has actually sent everything
+
+        Devices that can't drain say so with EINVAL/ENOTTY and are paced
+        by airtime alone. Any other failure means the port has gone, and
+        is raised as a SerialException, as pyserial reports a failed write.
+        """
+        try:
+            self.ser.flush()
+        except DRAIN_ERROR as e:
+            if e.args and e.args[0] in (errno.EINVAL, errno.ENOTTY):
+                return
+            raise serial.SerialException(f'drain failed: {e}') from e
+
+    def echo(self, data):
+        """Write data straight away, between frame chunks (keystroke echo)
+
+        Not paced and not held off by flow control: a few bytes of echo
+        are worth it to keep typing responsive.
+        """
+        with self.lock:
+            self.ser.write(data)
+        self.echoed += len(data)
+
+    def record(self, nbytes, seconds, stalled=0.0):
+        """Account for one flushed frame (stalled: seconds held off)"""
+        self.frames += 1
+        self.bytes_sent += nbytes
+        self.seconds_sent += seconds
+        self.last_bytes = nbytes
+        self.last_seconds = seconds
+        if stalled:
+            self.stalls += 1
+            self.stall_seconds += stalled
+        if self.flow != 'none':
+            self.adapt(bool(stalled))
+
+    @property
+    def bytes_per_second(self):
+        """Average effective throughput over all flushed frames"""
+        if not self.seconds_sent:
+            return 0.0
+        return self.bytes_sent / self.seconds_sent
+
+    def summary(self):
+        return (f"Link: {self.link_rate} bps, flow control {self.flow}, "
+                f"pacing at {self.baudrate:.0f} bps, "
+                f"{self.bytes_per_second:.0f} B/s effective, "
+                f"{self.stalls} stalls ({self.stall_seconds:.1f}s)")